@@ -0,0 +1,448 @@
+"""
+Shared SQLite Connection Helper
+
+Opens one long-lived connection per database file and re-uses it across
+callers instead of reconnecting (and re-applying default PRAGMAs) on every
+request.
+
+Usage:
+    from db import get_conn, shared_connection
+
+    conn = get_conn()                  # risk dashboard database
+    with shared_connection() as conn:  # drop-in for the old @contextmanager helpers
+        conn.execute("SELECT 1")
+    with transaction() as conn:        # multi-statement write (BEGIN IMMEDIATE ... COMMIT)
+        conn.execute("DELETE FROM ...")
+
+The shared connection is in autocommit mode and used by every thread, so an
+explicit transaction on it would absorb other threads' statements (and fail
+with "cannot start a transaction within a transaction" when two overlap).
+transaction() therefore runs on a separate writer connection per thread.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+RISK_DB = os.getenv('RISK_DB', 'risk_dashboard.db')
+KNOWLEDGE_DB = os.getenv('KNOWLEDGE_DB', 'risk_dashboard.db')
+
+# Applied once per connection when it is first opened
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-64000;
+    PRAGMA mmap_size=268435456;
+"""
+
+# Views the dashboard API reads from
+DASHBOARD_VIEWS = [
+    'dashboard_summary',
+    'dashboard_risk_breakdown',
+    'dashboard_initial_load',
+    'dashboard_trending_topics',
+    'dashboard_geographic_risk',
+    'recent_news_feed',
+]
+
+# Materialized copies of the dashboard aggregation views. SQLite has no
+# MATERIALIZED VIEW, so each is a plain table refreshed from its source view
+# whenever news_articles changes (see refresh_materialized).
+MATERIALIZED_VIEWS = {
+    'mv_dashboard_summary': 'dashboard_summary',
+    'mv_dashboard_risk_breakdown': 'dashboard_risk_breakdown',
+    'mv_dashboard_trending_topics': 'dashboard_trending_topics',
+}
+
+MATERIALIZED_INDEXES = {
+    'mv_dashboard_trending_topics': [
+        "CREATE INDEX IF NOT EXISTS ix_mv_ttp_keyword ON mv_dashboard_trending_topics(keyword)",
+    ],
+}
+
+# Generated columns on news_articles: (name, definition)
+SCHEMA_GENERATED_COLUMNS = [
+    # Lets keyword queries filter malformed JSON before json_each() without re-parsing in Python
+    ('keywords_json_valid', "INTEGER GENERATED ALWAYS AS (json_valid(keywords)) VIRTUAL"),
+]
+
+# Indexes on news_articles that the dashboard queries rely on
+SCHEMA_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_news_sent_sign ON news_articles(sentiment_score)",
+    # Recent-article feeds: index order satisfies ORDER BY, so no temp B-tree sort
+    "CREATE INDEX IF NOT EXISTS ix_news_pub ON news_articles(published_date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_news_prio_pub ON news_articles(display_priority DESC, published_date DESC)",
+    # Last-24-hour widgets (dashboard_initial_load): the date range is an index seek and
+    # the remaining columns are read from the index
+    "CREATE INDEX IF NOT EXISTS ix_news_pub_sent_cover ON news_articles(published_date, status, sentiment_score, severity_level)",
+    # Theme statistics only look at negative news: partial covering index so the
+    # aggregate is answered from the index without touching table rows
+    """CREATE INDEX IF NOT EXISTS ix_news_neg_theme_cover ON news_articles(
+        primary_theme, theme_display_name, processed_date, theme_confidence,
+        overall_risk_score, severity_level, is_market_moving, sentiment_score
+    ) WHERE sentiment_score < 0""",
+]
+
+# Views whose stored definition is replaced when it differs from the one here
+VIEW_DEFINITIONS = {
+    # Critical-alert count and sentiment split read the 24-hour slice once (last_day)
+    # instead of four correlated subqueries each re-scanning it
+    'dashboard_initial_load': """CREATE VIEW dashboard_initial_load AS
+WITH latest_date AS (
+    SELECT DATE(MAX(published_date)) as max_date
+    FROM news_articles 
+    WHERE status != 'Archived'
+),
+last_day AS (
+    -- Last 24 hours from latest date
+    SELECT 
+        COUNT(CASE WHEN severity_level IN ('Critical', 'High') THEN 1 END) as critical_alerts,
+        COUNT(CASE WHEN sentiment_score > 0.1 THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as positive_pct,
+        COUNT(CASE WHEN sentiment_score BETWEEN -0.1 AND 0.1 THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as neutral_pct,
+        COUNT(CASE WHEN sentiment_score < -0.1 THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as negative_pct
+    FROM news_articles, latest_date
+    WHERE published_date >= datetime(latest_date.max_date, '-1 day')
+      AND status != 'Archived'
+)
+SELECT 
+    -- Overall Risk Score Widget
+    COALESCE((SELECT overall_risk_score 
+              FROM risk_calculations 
+              WHERE calculation_date = (SELECT max_date FROM latest_date)
+              ORDER BY created_at DESC LIMIT 1), 0.0) as overall_risk_score,
+              
+    COALESCE((SELECT risk_trend 
+              FROM risk_calculations 
+              WHERE calculation_date = (SELECT max_date FROM latest_date)
+              ORDER BY created_at DESC LIMIT 1), 'Stable') as risk_trend,
+    
+    -- Critical Alerts Widget
+    last_day.critical_alerts,
+    
+    -- News Sentiment Analysis Widget
+    ROUND(last_day.positive_pct, 1) as positive_sentiment_pct,
+    ROUND(last_day.neutral_pct, 1) as neutral_sentiment_pct,
+    ROUND(last_day.negative_pct, 1) as negative_sentiment_pct,
+    
+    -- General Dashboard Summary (latest date)
+    ds.total_news_today,
+    ds.critical_count,
+    ds.high_count,
+    ds.avg_sentiment,
+    ds.current_risk_score,
+    
+    -- Cache timestamp for client deduplication
+    datetime('now') as cache_timestamp
+FROM dashboard_summary ds, latest_date, last_day""",
+}
+
+# Full-text index over headline/content (external content table kept in sync by triggers)
+FTS_TABLE = 'news_articles_fts'
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5(headline, content, content='news_articles', content_rowid='id')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON news_articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, headline, content) VALUES (new.id, new.headline, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON news_articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, headline, content)
+        VALUES ('delete', old.id, old.headline, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF id, headline, content ON news_articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, headline, content)
+        VALUES ('delete', old.id, old.headline, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, headline, content) VALUES (new.id, new.headline, new.content);
+    END""",
+]
+
+_CONNECTIONS = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+# Per-thread writer connections used by transaction(): thread-local -> {db_path: conn}.
+# close_all() bumps the generation so every thread reopens instead of reusing a closed one
+_WRITERS = threading.local()
+_ALL_WRITERS = []
+_WRITERS_LOCK = threading.Lock()
+_writer_generation = 0
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """Open an autocommit connection with the standard PRAGMAs"""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=30,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=256
+    )
+    conn.row_factory = sqlite3.Row
+    conn.executescript(CONNECTION_PRAGMAS)
+    return conn
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Open and tune a connection that can be shared between threads"""
+    conn = _connect(db_path)
+    try:
+        _ensure_schema(conn, db_path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Warning: Failed to prepare schema for {db_path}: {e}")
+    return conn
+
+
+def _object_exists(conn: sqlite3.Connection, name: str, obj_type: str) -> bool:
+    """Check sqlite_master for a table/view/index"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", [obj_type, name]
+    ).fetchone() is not None
+
+
+def _ensure_schema(conn: sqlite3.Connection, db_path: str):
+    """Idempotently create the derived tables this module manages"""
+    if not _object_exists(conn, 'news_articles', 'table'):
+        return
+
+    columns = {row['name'] for row in conn.execute("PRAGMA table_xinfo(news_articles)")}
+    for column, definition in SCHEMA_GENERATED_COLUMNS:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE news_articles ADD COLUMN {column} {definition}")
+
+    for statement in SCHEMA_INDEXES:
+        conn.execute(statement)
+
+    if not _object_exists(conn, FTS_TABLE, 'table'):
+        # Table, triggers and the initial rebuild commit together: if the rebuild fails
+        # (e.g. database is locked) nothing is created and the next start tries again,
+        # instead of leaving an index that misses every pre-existing article
+        with transaction(db_path) as writer:
+            if not _object_exists(writer, FTS_TABLE, 'table'):
+                for statement in FTS_SCHEMA:
+                    writer.execute(statement)
+                # Index the articles that existed before the triggers did
+                writer.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    # Planner statistics (also backs approximate_row_counts); analysis_limit keeps
+    # ANALYZE to a sample so it stays cheap on large tables
+    if not _object_exists(conn, 'sqlite_stat1', 'table'):
+        conn.executescript("PRAGMA analysis_limit=1000; ANALYZE;")
+
+    for view, definition in VIEW_DEFINITIONS.items():
+        _replace_view(conn, db_path, view, definition)
+
+    # Had no reader and only lengthened every refresh
+    conn.execute("DROP TABLE IF EXISTS mv_dashboard_initial_load")
+
+    for table, view in MATERIALIZED_VIEWS.items():
+        if _object_exists(conn, view, 'view'):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM {view}")
+            for statement in MATERIALIZED_INDEXES.get(table, []):
+                conn.execute(statement)
+
+
+def _replace_view(conn: sqlite3.Connection, db_path: str, name: str, definition: str):
+    """Swap in a new definition for an existing view whose stored SQL differs"""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", [name]
+    ).fetchone()
+    if row is None or row['sql'] == definition:
+        return
+
+    with transaction(db_path) as writer:
+        writer.execute(f'DROP VIEW IF EXISTS "{name}"')
+        writer.execute(definition)
+
+
+def ensure_schema(db_path: str = None):
+    """Make sure the managed indexes, columns and materialized tables exist"""
+    get_conn(db_path)
+
+
+def get_conn(db_path: str = None) -> sqlite3.Connection:
+    """
+    Get the shared connection for a database, opening it on first use
+
+    Args:
+        db_path: Database file path (defaults to RISK_DB)
+
+    Returns:
+        sqlite3.Connection with sqlite3.Row as row factory
+    """
+    db_path = db_path or RISK_DB
+    conn = _CONNECTIONS.get(db_path)
+    if conn is None:
+        with _CONNECTIONS_LOCK:
+            conn = _CONNECTIONS.get(db_path)
+            if conn is None:
+                conn = _open_connection(db_path)
+                _CONNECTIONS[db_path] = conn
+    return conn
+
+
+def _writer_connection(db_path: str) -> sqlite3.Connection:
+    """This thread's writer connection for a database, opened on first use"""
+    if getattr(_WRITERS, 'generation', None) != _writer_generation:
+        _WRITERS.connections = {}
+        _WRITERS.generation = _writer_generation
+    conn = _WRITERS.connections.get(db_path)
+    if conn is None:
+        conn = _WRITERS.connections[db_path] = _connect(db_path)
+        with _WRITERS_LOCK:
+            _ALL_WRITERS.append(conn)
+    return conn
+
+
+@contextmanager
+def transaction(db_path: str = None):
+    """
+    Run a multi-statement write in one BEGIN IMMEDIATE ... COMMIT transaction
+
+    Uses this thread's writer connection rather than the shared one, so
+    concurrent transactions wait on SQLite's write lock (busy timeout) instead
+    of nesting on one connection. Rolls back if the block raises.
+
+    Args:
+        db_path: Database file path (defaults to RISK_DB)
+    """
+    conn = _writer_connection(db_path or RISK_DB)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+@contextmanager
+def shared_connection(db_path: str = None):
+    """
+    Context manager wrapper around get_conn() for callers that use `with`.
+
+    The connection is shared, so leaving the block does not close it.
+    """
+    yield get_conn(db_path)
+
+
+def refresh_materialized(name: str = None, db_path: str = None):
+    """
+    Rebuild materialized dashboard tables from their source views
+
+    Args:
+        name: mv_* table to refresh (all of them if None)
+        db_path: Database file path (defaults to RISK_DB)
+    """
+    get_conn(db_path)  # schema (views, mv_* tables) is prepared when the shared connection opens
+    tables = [name] if name else list(MATERIALIZED_VIEWS)
+
+    with transaction(db_path) as conn:
+        for table in tables:
+            view = MATERIALIZED_VIEWS[table]
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM {view} WHERE 0")
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"INSERT INTO {table} SELECT * FROM {view}")
+
+
+def count_rows(names, db_path: str = None, conn: sqlite3.Connection = None) -> dict:
+    """
+    Row counts for several tables/views in two round trips
+
+    Existence is resolved with one sqlite_master lookup, then every existing
+    object is counted in a single UNION ALL statement.
+
+    Args:
+        names: Table or view names to count
+        db_path: Database file path (defaults to RISK_DB)
+        conn: Connection to count on instead of the shared one for db_path
+
+    Returns:
+        Dict of name -> row count (None for objects that do not exist)
+    """
+    conn = conn or get_conn(db_path)
+    names = list(names)
+    if not names:
+        return {}
+
+    placeholders = ','.join('?' * len(names))
+    existing = {row[0] for row in conn.execute(f"""
+        SELECT name FROM sqlite_master
+        WHERE type IN ('table', 'view') AND name IN ({placeholders})
+    """, names)}
+
+    counts = {name: None for name in names}
+    present = tuple(name for name in names if name in existing)
+    if present:
+        counts.update(dict(conn.execute(_union_count_sql(present)).fetchall()))
+    return counts
+
+
+@lru_cache(maxsize=32)
+def _union_count_sql(names: tuple) -> str:
+    """
+    UNION ALL count statement for a set of tables/views, generated once per set.
+
+    Returning the identical string each time also lets the connection's
+    statement cache reuse the compiled program.
+    """
+    return " UNION ALL ".join(
+        f"SELECT '{name}', COUNT(*) FROM \"{name}\"" for name in names
+    )
+
+
+def fts_phrase(text: str) -> str:
+    """Quote free text as a single FTS5 phrase so user input can't break MATCH syntax"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def approximate_row_counts(tables, db_path: str = None) -> dict:
+    """
+    O(1) row-count estimates from sqlite_stat1 (populated by ANALYZE)
+
+    Good enough for health checks and diagnostics; use count_rows() when an
+    exact figure matters.
+
+    Args:
+        tables: Table names to estimate
+        db_path: Database file path (defaults to RISK_DB)
+
+    Returns:
+        Dict of table -> estimated row count (None if no statistics exist)
+    """
+    conn = get_conn(db_path)
+    estimates = {table: None for table in tables}
+    if not estimates or not _object_exists(conn, 'sqlite_stat1', 'table'):
+        return estimates
+
+    placeholders = ','.join('?' * len(estimates))
+    for row in conn.execute(f"""
+        SELECT tbl, stat FROM sqlite_stat1 WHERE tbl IN ({placeholders})
+    """, list(estimates)):
+        # First integer of every stat row is the table's row count estimate
+        estimate = int(row['stat'].split()[0])
+        estimates[row['tbl']] = max(estimates[row['tbl']] or 0, estimate)
+    return estimates
+
+
+def close_all():
+    """Close every shared and writer connection (used on shutdown / in dev tools)"""
+    global _writer_generation
+    with _CONNECTIONS_LOCK:
+        for conn in _CONNECTIONS.values():
+            conn.close()
+        _CONNECTIONS.clear()
+    with _WRITERS_LOCK:
+        _writer_generation += 1
+        for conn in _ALL_WRITERS:
+            conn.close()
+        _ALL_WRITERS.clear()
+
+
+# Pre-generate the statement for the common dashboard health set at import
+_union_count_sql(tuple(DASHBOARD_VIEWS) + tuple(MATERIALIZED_VIEWS))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Database Inspection Utilities
+=============================
+
+Quick read-only look at the risk dashboard database schema and contents.
+The database is opened with mode=ro and without db.py's schema setup, so
+inspecting never migrates, re-indexes or refreshes anything.
+
+Usage:
+    python dbinspect.py tables                     # List tables
+    python dbinspect.py views                      # List views
+    python dbinspect.py view-sql <view>            # Show a view's SQL definition
+    python dbinspect.py counts [name ...]          # Row counts (default: dashboard views)
+    python dbinspect.py sample <name> [N]          # Show first N rows (default: 5)
+"""
+
+import sys
+import sqlite3
+from functools import lru_cache
+from db import count_rows, DASHBOARD_VIEWS, RISK_DB
+
+
+@lru_cache(maxsize=None)
+def get_conn() -> sqlite3.Connection:
+    """Read-only connection to RISK_DB, opened on first use"""
+    conn = sqlite3.connect(f"file:{RISK_DB}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _schema_objects() -> dict:
+    """Tables and views from a single sqlite_master scan"""
+    objects = {'table': [], 'view': []}
+    for row in get_conn().execute("""
+        SELECT type, name FROM sqlite_master
+        WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'
+        ORDER BY name
+    """):
+        objects[row['type']].append(row['name'])
+    return objects
+
+
+def tables() -> list:
+    """Names of all user tables"""
+    return _schema_objects()['table']
+
+
+def views() -> list:
+    """Names of all views"""
+    return _schema_objects()['view']
+
+
+def view_sql(name: str) -> str:
+    """SQL definition of a view (None if it does not exist)"""
+    row = get_conn().execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", [name]
+    ).fetchone()
+    return row['sql'] if row else None
+
+
+def counts(*names) -> dict:
+    """Row counts for tables/views (defaults to the dashboard views)"""
+    return count_rows(names or DASHBOARD_VIEWS, conn=get_conn())
+
+
+def sample(name: str, n: int = 5) -> list:
+    """First n rows of a table or view as dictionaries"""
+    objects = _schema_objects()
+    if name not in objects['table'] + objects['view']:
+        raise ValueError(f"Unknown table or view: {name}")
+    rows = get_conn().execute(f'SELECT * FROM "{name}" LIMIT ?', [n]).fetchall()
+    return [dict(row) for row in rows]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    command = sys.argv[1].lower()
+    args = sys.argv[2:]
+
+    if command in ("tables", "views"):
+        names = _schema_objects()[command[:-1]]
+        print(f"📋 {len(names)} {command}:")
+        print("\n".join(f"   • {name}" for name in names))
+
+    elif command == "view-sql" and args:
+        sql = view_sql(args[0])
+        print(sql if sql else f"❌ View not found: {args[0]}")
+
+    elif command == "counts":
+        for name, count in counts(*args).items():
+            if count is None:
+                print(f"   ❌ {name}: missing")
+            else:
+                print(f"   ✅ {name}: {count} rows")
+
+    elif command == "sample" and args:
+        n = int(args[1]) if len(args) > 1 else 5
+        try:
+            for row in sample(args[0], n):
+                print(row)
+        except ValueError as e:
+            print(f"❌ {e}")
+
+    else:
+        print("❌ Unknown command. Available commands:")
+        print("   tables           - List tables")
+        print("   views            - List views")
+        print("   view-sql <view>  - Show view SQL")
+        print("   counts [names]   - Row counts")
+        print("   sample <name> N  - Show first N rows")
+
+
+if __name__ == "__main__":
+    main()
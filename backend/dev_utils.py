@@ -10,59 +10,81 @@ Usage:
     python dev_utils.py status         # Show comprehensive system status  
     python dev_utils.py add-test [N]   # Add N test news articles
     python dev_utils.py monitor        # Live monitoring of processing
+    python dev_utils.py check-concurrent [N]  # Two back-to-back concurrent batches of N articles
 """
 
 import sys
 import time
+import sqlite3
 from news_risk_analyzer import (
+    Config,
     dev_reset_all_tables, 
     dev_add_test_news, 
     dev_system_status,
-    get_knowledge_db_connection,
-    get_risk_db_connection
+    dev_check_concurrent_processing
 )
 
+# One statement per monitor tick: raw queue stats (attached knowledge DB as `k`),
+# processed count and the latest processed headline
+LIVE_MONITOR_SQL = """
+    SELECT 
+        raw.total, raw.unprocessed, processed.total,
+        substr(latest.headline, 1, 40), latest.severity_level
+    FROM (
+        SELECT COUNT(*) as total, COUNT(CASE WHEN processed = 0 THEN 1 END) as unprocessed
+        FROM k.raw_news_data
+    ) raw
+    CROSS JOIN (SELECT COUNT(*) as total FROM news_articles) processed
+    LEFT JOIN (
+        SELECT headline, severity_level
+        FROM news_articles 
+        ORDER BY id DESC 
+        LIMIT 1
+    ) latest ON 1
+"""
+
+# Seconds between status lines; the status query only reruns when the databases changed
+MONITOR_POLL_INTERVAL = 5
+
 def live_monitor():
-    """Live monitoring of the processing system"""
+    """Live monitoring of the processing system (re-queries only when the databases change)"""
     print("🔍 LIVE SYSTEM MONITOR")
     print("Press Ctrl+C to stop monitoring")
     print("=" * 60)
     
+    # Single connection for the whole session with the knowledge DB attached
+    conn = sqlite3.connect(Config.RISK_DB, timeout=Config.CONNECTION_TIMEOUT)
+    conn.execute("ATTACH DATABASE ? AS k", [Config.KNOWLEDGE_DB])
+    
+    last_version = None
+    
     try:
         while True:
-            # Get current counts
-            with get_knowledge_db_connection() as knowledge_conn:
-                raw_stats = knowledge_conn.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        COUNT(CASE WHEN processed = 0 THEN 1 END) as unprocessed,
-                        COUNT(CASE WHEN processed = 1 THEN 1 END) as processed
-                    FROM raw_news_data
-                """).fetchone()
-            
-            with get_risk_db_connection() as risk_conn:
-                processed_count = risk_conn.execute("SELECT COUNT(*) FROM news_articles").fetchone()[0]
-                
-                # Get latest processed news
-                latest_news = risk_conn.execute("""
-                    SELECT headline, severity_level, created_at
-                    FROM news_articles 
-                    ORDER BY id DESC 
-                    LIMIT 3
-                """).fetchall()
+            # data_version changes whenever another connection writes to the file,
+            # so an idle tick costs two PRAGMAs instead of the full status query
+            version = (
+                conn.execute("PRAGMA main.data_version").fetchone()[0],
+                conn.execute("PRAGMA k.data_version").fetchone()[0]
+            )
+            if version != last_version:
+                last_version = version
+                stats = conn.execute(LIVE_MONITOR_SQL).fetchone()
+            raw_total, raw_unprocessed, processed_count, latest_headline, latest_severity = stats
             
             # Clear screen and show status
-            print(f"\r🕐 {time.strftime('%H:%M:%S')} | Raw: {raw_stats[0]} total, {raw_stats[1]} unprocessed | Processed: {processed_count} | ", end="", flush=True)
+            print(f"\r🕐 {time.strftime('%H:%M:%S')} | Raw: {raw_total} total, {raw_unprocessed} unprocessed | Processed: {processed_count} | ", end="", flush=True)
             
-            if latest_news:
-                print(f"Latest: {latest_news[0][0][:40]}... ({latest_news[0][1]})")
+            if latest_headline:
+                print(f"Latest: {latest_headline}... ({latest_severity})")
             else:
                 print("No processed news yet")
             
-            time.sleep(5)  # Update every 5 seconds
+            time.sleep(MONITOR_POLL_INTERVAL)
             
     except KeyboardInterrupt:
         print("\n👋 Monitor stopped")
+    finally:
+        conn.close()
 
 def main():
     if len(sys.argv) < 2:
@@ -89,12 +111,17 @@ def main():
     elif command == "monitor":
         live_monitor()
         
+    elif command == "check-concurrent":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+        dev_check_concurrent_processing(count)
+        
     else:
         print("❌ Unknown command. Available commands:")
         print("   reset     - Reset all tables and start fresh")
         print("   status    - Show comprehensive system status")
         print("   add-test  - Add test news articles")
         print("   monitor   - Live monitoring of processing")
+        print("   check-concurrent - Two back-to-back concurrent batches")
 
 if __name__ == "__main__":
     main()
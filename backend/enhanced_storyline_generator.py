@@ -4,10 +4,50 @@ Enhanced Storyline Generation System
 Handles large article volumes and creates comprehensive banking risk storylines.
 """
 
-import json
+import heapq
+from itertools import chain, islice, repeat
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import random
+import string
+
+# orjson parses small JSON arrays several times faster; fall back to stdlib json
+try:
+    from orjson import loads as _jloads
+except ImportError:
+    from json import loads as _jloads
+
+# Severity ordering shared by ranking and severity distributions (highest first)
+_SEVERITY_RANK = {"Critical": 4, "High": 3, "Medium": 2, "Low": 1}
+
+def _iso_key(published_date: str) -> str:
+    """
+    Sort key for ISO-8601 dates. Fixed-width ISO strings order the same as
+    the timestamps they encode, so no datetime parsing is needed.
+    """
+    return published_date or "2020-01-01"
+
+def _clip(text: str, limit: int = 200) -> str:
+    """Truncate text to limit characters, adding an ellipsis only when something was cut"""
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit] + "..."
+
+def _dedupe(items: List[Dict]) -> List[Dict]:
+    """
+    Order-preserving dedupe by object identity (dicts are unhashable, and
+    articles without an "id" key would all collide on None)
+    """
+    seen = set()
+    add_seen = seen.add
+    unique = []
+    for item in items:
+        key = id(item)
+        if key not in seen:
+            add_seen(key)
+            unique.append(item)
+    return unique
 
 def smart_article_selection(articles: List[Dict], max_articles: int = 25) -> List[Dict]:
     """
@@ -17,25 +57,41 @@ def smart_article_selection(articles: List[Dict], max_articles: int = 25) -> Lis
     if len(articles) <= max_articles:
         return articles
     
-    # Sort by importance: severity + risk score + recency
-    sorted_articles = sorted(articles, key=lambda x: (
-        {"Critical": 4, "High": 3, "Medium": 2, "Low": 1}.get(x.get("severity_level", "Low"), 1),
-        x.get("overall_risk_score", 0),
-        datetime.fromisoformat(x.get("published_date", "2020-01-01")).timestamp()
-    ), reverse=True)
+    # Rank by importance: severity + risk score + recency
+    # Keys are computed once per article (decorate-sort-undecorate); -index keeps
+    # the ranking stable for ties and avoids ever comparing the dicts themselves
+    keyed = [
+        (
+            _SEVERITY_RANK.get(article.get("severity_level", "Low"), 1),
+            article.get("overall_risk_score", 0),
+            _iso_key(article.get("published_date")),
+            -index,
+            article
+        )
+        for index, article in enumerate(articles)
+    ]
+    # Only the head of the ranking is ever consumed: top/recent come from the first
+    # max_articles and the diversity pass needs at most max_articles//4 more, so a
+    # bounded heap (O(N log K)) replaces the full O(N log N) sort
+    ranked = heapq.nlargest(max_articles + max_articles//4, keyed)
+    sorted_articles = [entry[-1] for entry in ranked]
     
     # Take top articles by importance
     top_articles = sorted_articles[:max_articles//2]
     
-    # Add some recent articles for timeline diversity
-    recent_articles = sorted_articles[:max_articles][-max_articles//3:]
+    # Add the most recent articles for timeline diversity (a separate bounded heap
+    # on publish date; the importance ranking above says nothing about recency)
+    recent_articles = [
+        entry[-1] for entry in heapq.nlargest(max_articles//3, keyed, key=lambda entry: entry[2])
+    ]
     
     # Add some geographic/market diversity
-    # Create sets of article IDs for deduplication
-    top_article_ids = {article.get("id") for article in top_articles}
-    recent_article_ids = {article.get("id") for article in recent_articles}
+    # Track membership by object identity: O(1) set lookups that also work for
+    # articles without an "id" key (which would otherwise all collide on None)
+    taken = {id(article) for article in top_articles}
+    taken.update(id(article) for article in recent_articles)
     
-    remaining = [a for a in sorted_articles if a.get("id") not in top_article_ids and a.get("id") not in recent_article_ids]
+    remaining = [a for a in sorted_articles if id(a) not in taken]
     diverse_articles = []
     seen_countries = set()
     seen_markets = set()
@@ -56,16 +112,8 @@ def smart_article_selection(articles: List[Dict], max_articles: int = 25) -> Lis
         if len(diverse_articles) >= max_articles//4:
             break
     
-    # Combine all selected articles using ID-based deduplication
-    selected_articles = []
-    seen_ids = set()
-    
-    for article_list in [top_articles, recent_articles, diverse_articles]:
-        for article in article_list:
-            article_id = article.get("id")
-            if article_id not in seen_ids:
-                selected_articles.append(article)
-                seen_ids.add(article_id)
+    # Combine all selected articles, deduplicating by object identity
+    selected_articles = _dedupe(top_articles + recent_articles + diverse_articles)
     
     # Ensure we don't exceed max_articles
     if len(selected_articles) > max_articles:
@@ -74,75 +122,110 @@ def smart_article_selection(articles: List[Dict], max_articles: int = 25) -> Lis
     # Sort by date for chronological analysis
     return sorted(selected_articles, key=lambda x: x.get("published_date", "2020-01-01"))
 
+def _as_list(value) -> List:
+    """
+    Normalize a JSON-encoded or native list field (e.g. countries) to a list.
+
+    Callers should pass already-decoded lists (the API parses these columns
+    when it loads the articles); the string branch only covers raw rows.
+    """
+    if isinstance(value, str):
+        return _jloads(value) if value else []
+    return value or []
+
+def _significant_linkages(pairs) -> Dict[str, List[str]]:
+    """
+    Bucket (key, headline) pairs in one pass, keeping only keys seen 2+ times.
+
+    The first headline per key is parked separately and a headline list is only
+    allocated on the second sighting, so long-tail singletons cost no list.
+    """
+    first_seen = {}
+    linked = {}
+    for key, headline in pairs:
+        if key in linked:
+            linked[key].append(headline)
+        elif key in first_seen:
+            linked[key] = [first_seen[key], headline]
+        else:
+            first_seen[key] = headline
+    return linked
+
 def create_storyline_context(articles: List[Dict], theme_name: str) -> Dict[str, Any]:
     """
     Create comprehensive context for storyline generation.
+    Aggregates everything in a single pass over the articles.
     """
     countries_set = set()
     markets_set = set()
-    severity_counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
+    severity_counts = Counter()
     
     timeline = []
-    cross_linkages = []
+    
+    # Cross-linkages: (country/market, headline) pairs per article, bucketed once
+    # after the loop
+    country_pairs = []
+    market_pairs = []
+    
+    min_date = max_date = None
+    risk_sum = 0
+    risk_max = None
+    
+    # Bound methods resolved once instead of on every iteration
+    countries_update = countries_set.update
+    markets_update = markets_set.update
+    timeline_append = timeline.append
+    country_pairs_append = country_pairs.append
+    market_pairs_append = market_pairs.append
     
     for article in articles:
-        # Aggregate geographic and market data
-        if article.get("countries"):
-            if isinstance(article["countries"], str):
-                countries = json.loads(article["countries"])
-            else:
-                countries = article["countries"]
-            countries_set.update(countries)
+        get = article.get
+        headline = get("headline", "")
+        countries = _as_list(get("countries"))
+        markets = _as_list(get("affected_markets"))
+        severity = get("severity_level", "Low")
+        risk_score = get("overall_risk_score", 0)
+        published = get("published_date", "")
         
-        if article.get("affected_markets"):
-            if isinstance(article["affected_markets"], str):
-                markets = json.loads(article["affected_markets"])
-            else:
-                markets = article["affected_markets"]
-            markets_set.update(markets)
+        # Aggregate geographic and market data
+        countries_update(countries)
+        markets_update(markets)
         
         # Count severity levels
-        severity = article.get("severity_level", "Low")
-        if severity in severity_counts:
-            severity_counts[severity] += 1
+        severity_counts[severity] += 1
         
-        # Build timeline entry
-        timeline.append({
-            "date": article.get("published_date"),
-            "headline": article.get("headline"),
-            "severity": severity,
-            "risk_score": article.get("overall_risk_score", 0),
-            "countries": article.get("countries", [])
-        })
-    
-    # Identify cross-linkages (same countries/markets appearing across articles)
-    country_appearances = {}
-    market_appearances = {}
-    
-    for article in articles:
-        countries = article.get("countries", [])
-        markets = article.get("affected_markets", [])
+        # Date range and risk score stats
+        if min_date is None or published < min_date:
+            min_date = published
+        if max_date is None or published > max_date:
+            max_date = published
+        risk_sum += risk_score
+        if risk_max is None or risk_score > risk_max:
+            risk_max = risk_score
         
-        for country in countries:
-            if country not in country_appearances:
-                country_appearances[country] = []
-            country_appearances[country].append(article.get("headline", ""))
+        # Build timeline entry (only the first 10 are ever reported)
+        if len(timeline) < 10:
+            timeline_append({
+                "date": get("published_date"),
+                "headline": get("headline"),
+                "severity": severity,
+                "risk_score": risk_score,
+                "countries": countries
+            })
         
-        for market in markets:
-            if market not in market_appearances:
-                market_appearances[market] = []
-            market_appearances[market].append(article.get("headline", ""))
+        country_pairs_append(zip(countries, repeat(headline)))
+        market_pairs_append(zip(markets, repeat(headline)))
     
     # Find significant cross-linkages (appearing in 2+ articles)
-    significant_countries = {k: v for k, v in country_appearances.items() if len(v) >= 2}
-    significant_markets = {k: v for k, v in market_appearances.items() if len(v) >= 2}
+    significant_countries = _significant_linkages(chain.from_iterable(country_pairs))
+    significant_markets = _significant_linkages(chain.from_iterable(market_pairs))
     
     return {
         "theme_name": theme_name,
         "article_count": len(articles),
         "date_range": {
-            "start": min(a.get("published_date", "") for a in articles),
-            "end": max(a.get("published_date", "") for a in articles)
+            "start": min_date,
+            "end": max_date
         },
         "geographic_scope": {
             "countries": list(countries_set),
@@ -154,71 +237,25 @@ def create_storyline_context(articles: List[Dict], theme_name: str) -> Dict[str,
             "market_count": len(markets_set),
             "cross_market_events": significant_markets
         },
-        "severity_distribution": severity_counts,
-        "timeline": timeline[:10],  # Most recent 10 for context
-        "avg_risk_score": sum(a.get("overall_risk_score", 0) for a in articles) / len(articles),
-        "max_risk_score": max(a.get("overall_risk_score", 0) for a in articles)
+        # Plain dict of the four known levels (unknown severities are not reported)
+        "severity_distribution": {level: severity_counts[level] for level in _SEVERITY_RANK},
+        "timeline": timeline,  # Most recent 10 for context
+        "avg_risk_score": risk_sum / len(articles),
+        "max_risk_score": risk_max
     }
 
-def generate_comprehensive_storyline_prompt(context: Dict[str, Any], articles: List[Dict]) -> str:
-    """
-    Generate a comprehensive prompt for LLM storyline creation.
-    """
-    
-    # Create executive summary data
-    exec_data = f"""
-THEME: {context['theme_name']}
-SCOPE: {context['article_count']} articles over {context['date_range']['start']} to {context['date_range']['end']}
-GEOGRAPHIC REACH: {context['geographic_scope']['country_count']} countries
-MARKET IMPACT: {context['market_scope']['market_count']} market sectors
-SEVERITY BREAKDOWN: {context['severity_distribution']['Critical']} Critical, {context['severity_distribution']['High']} High, {context['severity_distribution']['Medium']} Medium, {context['severity_distribution']['Low']} Low
-AVERAGE RISK SCORE: {context['avg_risk_score']:.1f}/10
-"""
-
-    # Key articles for analysis
-    key_articles = articles[:8]  # Top 8 most important
-    article_summaries = []
-    
-    for i, article in enumerate(key_articles, 1):
-        # Include more details and actual content for better referencing
-        content_preview = ""
-        if article.get('content'):
-            content_preview = f"\n   Content Preview: {article.get('content', '')[:300]}..."
-        elif article.get('summary'):
-            content_preview = f"\n   Summary: {article.get('summary', '')[:300]}..."
-        
-        article_summaries.append(f"""
-ARTICLE {i}: {article.get('headline', 'No headline')}
-   Date: {article.get('published_date', 'Unknown')}
-   Source: {article.get('source_name', 'Unknown')}
-   Severity: {article.get('severity_level', 'Low')} | Risk Score: {article.get('overall_risk_score', 0):.1f}
-   Countries: {', '.join(article.get('countries', [])[:3])}
-   Markets: {', '.join(article.get('affected_markets', [])[:3])}{content_preview}
-""")
-    
-    # Cross-linkage analysis
-    cross_linkages = []
-    if context['geographic_scope']['cross_country_events']:
-        cross_linkages.append("GEOGRAPHIC CROSS-LINKAGES:")
-        for country, events in list(context['geographic_scope']['cross_country_events'].items())[:5]:
-            cross_linkages.append(f"• {country}: {len(events)} related events")
-    
-    if context['market_scope']['cross_market_events']:
-        cross_linkages.append("MARKET CROSS-LINKAGES:")
-        for market, events in list(context['market_scope']['cross_market_events'].items())[:5]:
-            cross_linkages.append(f"• {market}: {len(events)} related events")
-
-    prompt = f"""
+# Static storyline prompt skeleton, parsed once at import; only the data sections vary
+_STORYLINE_PROMPT_TEMPLATE = string.Template("""
 You are a senior financial risk analyst at a major international bank, tasked with creating a comprehensive risk storyline for the executive committee.
 
 === SITUATION OVERVIEW ===
-{exec_data}
+$exec_data
 
 === KEY DEVELOPMENTS ===
-{chr(10).join(article_summaries)}
+$key_developments
 
 === CROSS-LINKAGE ANALYSIS ===
-{chr(10).join(cross_linkages)}
+$cross_linkages
 
 === TASK ===
 Create a professional, executive-level risk storyline that connects these events into a coherent narrative. 
@@ -288,20 +325,78 @@ Focus on:
 - Credit portfolio impacts
 - Operational resilience
 - Reputational risk considerations
+""")
+
+def generate_comprehensive_storyline_prompt(context: Dict[str, Any], articles: List[Dict]) -> str:
+    """
+    Generate a comprehensive prompt for LLM storyline creation.
+    """
+    
+    # Create executive summary data
+    exec_data = f"""
+THEME: {context['theme_name']}
+SCOPE: {context['article_count']} articles over {context['date_range']['start']} to {context['date_range']['end']}
+GEOGRAPHIC REACH: {context['geographic_scope']['country_count']} countries
+MARKET IMPACT: {context['market_scope']['market_count']} market sectors
+SEVERITY BREAKDOWN: {context['severity_distribution']['Critical']} Critical, {context['severity_distribution']['High']} High, {context['severity_distribution']['Medium']} Medium, {context['severity_distribution']['Low']} Low
+AVERAGE RISK SCORE: {context['avg_risk_score']:.1f}/10
 """
 
-    return prompt
+    # Key articles for analysis
+    key_articles = articles[:8]  # Top 8 most important
+    article_summaries = []
+    add_summary = article_summaries.append
+    
+    for i, article in enumerate(key_articles, 1):
+        # Include more details and actual content for better referencing
+        content_preview = ""
+        content = article.get('content')
+        summary = article.get('summary')
+        if content:
+            content_preview = f"\n   Content Preview: {_clip(content, 300)}"
+        elif summary:
+            content_preview = f"\n   Summary: {_clip(summary, 300)}"
+        
+        add_summary(f"""
+ARTICLE {i}: {article.get('headline', 'No headline')}
+   Date: {article.get('published_date', 'Unknown')}
+   Source: {article.get('source_name', 'Unknown')}
+   Severity: {article.get('severity_level', 'Low')} | Risk Score: {article.get('overall_risk_score', 0):.1f}
+   Countries: {', '.join(article.get('countries', [])[:3])}
+   Markets: {', '.join(article.get('affected_markets', [])[:3])}{content_preview}
+""")
+    
+    # Cross-linkage analysis
+    cross_linkages = []
+    if context['geographic_scope']['cross_country_events']:
+        cross_linkages.append("GEOGRAPHIC CROSS-LINKAGES:")
+        for country, events in list(context['geographic_scope']['cross_country_events'].items())[:5]:
+            cross_linkages.append(f"• {country}: {len(events)} related events")
+    
+    if context['market_scope']['cross_market_events']:
+        cross_linkages.append("MARKET CROSS-LINKAGES:")
+        for market, events in list(context['market_scope']['cross_market_events'].items())[:5]:
+            cross_linkages.append(f"• {market}: {len(events)} related events")
+
+    return _STORYLINE_PROMPT_TEMPLATE.substitute(
+        exec_data=exec_data,
+        key_developments="\n".join(article_summaries),
+        cross_linkages="\n".join(cross_linkages)
+    )
 
 def create_downloadable_report_data(storyline: str, context: Dict[str, Any], articles: List[Dict]) -> Dict[str, Any]:
     """
     Create comprehensive data structure for downloadable report.
     """
     
+    # One clock read so generated_at and report_id can't straddle midnight
+    now = datetime.now()
+    
     return {
         "report_metadata": {
             "title": f"Risk Storyline Report: {context['theme_name']}",
-            "generated_at": datetime.now().isoformat(),
-            "report_id": f"RSR-{context['theme_name'].replace(' ', '-').upper()}-{datetime.now().strftime('%Y%m%d')}",
+            "generated_at": now.isoformat(),
+            "report_id": f"RSR-{context['theme_name'].replace(' ', '-').upper()}-{now:%Y%m%d}",
             "analyst": "AI Risk Analytics System",
             "classification": "CONFIDENTIAL - INTERNAL USE ONLY"
         },
@@ -335,12 +430,13 @@ def create_downloadable_report_data(storyline: str, context: Dict[str, Any], art
                 "risk_score": article.get("overall_risk_score"),
                 "countries": article.get("countries", [])
             }
-            for article in articles[:20]  # Top 20 articles for reference
+            for article in islice(articles, 20)  # Top 20 articles for reference
         ],
         "risk_metrics": {
             "total_articles_analyzed": len(articles),
-            "critical_articles": len([a for a in articles if a.get("severity_level") == "Critical"]),
-            "high_risk_articles": len([a for a in articles if a.get("severity_level") == "High"]),
+            # Already counted while building the context; no need to rescan articles
+            "critical_articles": context['severity_distribution']['Critical'],
+            "high_risk_articles": context['severity_distribution']['High'],
             "avg_risk_score": context['avg_risk_score'],
             "risk_distribution": context['severity_distribution']
         }
@@ -3,109 +3,186 @@ Evaluator-Optimizer Workflow for Risk Analysis
 Following the Anthropic "Building Effective Agents" cookbook pattern using OpenAI.
 Clean implementation with no fallback logic - errors are handled by Huey retries.
 """
+import os
+import re
 import json
-from typing import Dict, List, Tuple
+import time
+import asyncio
+import difflib
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from util import llm_call, extract_xml, parse_json_from_xml, validate_risk_analysis
 
+from db import get_conn
+from llm_cache import create_llm_cache
+from util import (
+    client, get_model_name, llm_call, llm_call_async, aclose_async_client, discard_cached_response,
+    parse_json_from_xml, validate_risk_analysis, truncate_tokens
+)
 
-def get_recent_scoring_context(limit=50):
-    """Get recent articles with scores for relative comparison"""
-    from news_risk_analyzer import get_risk_db_connection
+# orjson serializes/parses analyses several times faster; fall back to stdlib json
+# (both produce the same compact UTF-8 form)
+try:
+    import orjson
     
-    try:
-        with get_risk_db_connection() as conn:
-            cursor = conn.execute("""
-                SELECT summary, severity_level, sentiment_score, impact_score, 
-                       confidence_score, primary_risk_category, is_market_moving,
-                       published_date
-                FROM news_articles 
-                ORDER BY published_date DESC
-                LIMIT ?
-            """, [limit])
-            
-            articles = cursor.fetchall()
-            if not articles:
-                return "No recent articles for comparison."
-            
-            context_lines = ["RECENT ARTICLES FOR RELATIVE SCORING COMPARISON:"]
-            for i, art in enumerate(articles, 1):
-                market_moving = "Market-Moving" if art['is_market_moving'] else "Non-Market-Moving"
-                context_lines.append(
-                    f"{i}. {art['summary'][:80]}... "
-                    f"[{art['severity_level']} | Sentiment: {art['sentiment_score']:.2f} | "
-                    f"Impact: {art['impact_score']} | Confidence: {art['confidence_score']}% | "
-                    f"{art['primary_risk_category']} | {market_moving} | {art['published_date'][:10]}]"
-                )
-            
-            return "\n".join(context_lines)
-    except Exception as e:
-        return f"Context unavailable: {e}"
+    def _compact_json(obj) -> str:
+        return orjson.dumps(obj).decode()
+    
+    _json_loads = orjson.loads
+except ImportError:
+    def _compact_json(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+    
+    _json_loads = json.loads
 
+# Terse progress at INFO; full thoughts/feedback only at DEBUG (formatted lazily)
+logger = logging.getLogger(__name__)
 
-class RiskAnalysisEvaluatorOptimizer:
-    """
-    Evaluator-Optimizer workflow following the Anthropic cookbook pattern.
-    Generator creates risk analysis, Evaluator provides feedback, loop until acceptable.
-    """
-    
-    def __init__(self, max_iterations: int = 1):
-        """
-        Initialize the Evaluator-Optimizer system.
+# Concurrent articles in aprocess_news_batch (further bounded by the util.py rate limiter)
+MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '10'))
+
+# Have the generator grade its own output in the same call; the independent
+# evaluator only runs when the self-evaluation is FAIL (or missing)
+SELF_EVALUATION = os.getenv('SELF_EVALUATION', 'true').lower() == 'true'
+
+# Self-evaluation verdicts accepted without a separate evaluator call
+TRUSTED_SELF_EVALUATIONS = ("PASS", "NEEDS_IMPROVEMENT")
+
+# Appended to the generator system prompt when self-evaluation is enabled
+SELF_EVALUATION_INSTRUCTIONS = """
         
-        Args:
-            max_iterations: Maximum number of improvement iterations
-        """
-        self.max_iterations = max_iterations
-    
-    def generate_risk_analysis(self, news_data: Dict, feedback_context: str = "") -> Tuple[str, Dict]:
-        """
-        Generator: Create risk analysis from news data using OpenAI via util.py.
+        After the response, audit your own analysis as a senior financial risk assessment auditor would:
+        check risk categorization, severity, confidence scoring, market impact, action requirement,
+        financial exposure realism, geographic/entity accuracy and the quality of the description.
+        Then append:
         
-        Args:
-            news_data: News article data
-            feedback_context: Previous feedback for improvement context
-            
-        Returns:
-            Tuple of (reasoning, risk_analysis_dict)
-        """
-        system_prompt = """You are a financial risk analyst specializing in international banking and financial risk.
+        <self_evaluation>PASS, NEEDS_IMPROVEMENT, or FAIL</self_evaluation>
+        <self_feedback>
+        Specific, actionable feedback on what needs improvement and why (or why it passes).
+        </self_feedback>"""
+
+# Structured outputs: the API guarantees schema-valid JSON, so there is no XML/JSON
+# extraction to fail. Azure needs api-version 2024-08-01-preview or later for json_schema.
+STRUCTURED_OUTPUTS = os.getenv(
+    'STRUCTURED_OUTPUTS', 'false' if os.getenv('LLM_PROVIDER', 'openai').lower() == 'azure' else 'true'
+).lower() == 'true'
+
+# json_schema: the API enforces the full schema. json_object: the API only guarantees valid JSON
+# (fields follow the prompt), for Azure api-versions that predate json_schema support.
+STRUCTURED_OUTPUTS_MODE = os.getenv('STRUCTURED_OUTPUTS_MODE', 'json_schema').lower()
+
+RISK_CATEGORIES = [
+    "market_risk", "credit_risk", "operational_risk", "liquidity_risk",
+    "cybersecurity_risk", "regulatory_risk", "systemic_risk", "reputational_risk"
+]
+LEVELS = ["Critical", "High", "Medium", "Low"]
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# JSON schema of the generator output ("reasoning" replaces the <thoughts> block)
+RISK_ANALYSIS_PROPERTIES = {
+    "reasoning": {"type": "string"},
+    "primary_risk_category": {"type": "string", "enum": RISK_CATEGORIES},
+    "secondary_risk_categories": {"type": "array", "items": {"type": "string", "enum": RISK_CATEGORIES}},
+    "risk_subcategories": _STRING_LIST,
+    "severity_level": {"type": "string", "enum": LEVELS},
+    "urgency_level": {"type": "string", "enum": LEVELS},
+    "temporal_impact": {"type": "string", "enum": ["Immediate", "Short-term", "Medium-term", "Long-term"]},
+    "sentiment_score": {"type": "number"},
+    "confidence_score": {"type": "integer"},
+    "impact_score": {"type": "integer"},
+    "financial_exposure": {"type": "number"},
+    "risk_contribution": {"type": "number"},
+    "geographic_regions": _STRING_LIST,
+    "industry_sectors": _STRING_LIST,
+    "countries": _STRING_LIST,
+    "coordinates": {
+        "type": "object",
+        "properties": {"lat": {"type": "number"}, "lng": {"type": "number"}},
+        "required": ["lat", "lng"],
+        "additionalProperties": False
+    },
+    "affected_markets": _STRING_LIST,
+    "keywords": _STRING_LIST,
+    "entities": _STRING_LIST,
+    "is_market_moving": {"type": "boolean"},
+    "is_breaking_news": {"type": "boolean"},
+    "is_regulatory": {"type": "boolean"},
+    "requires_action": {"type": "boolean"},
+    "summary": {"type": "string"},
+    "description": {"type": "string"},
+    "historical_impact_analysis": {"type": "string"},
+}
+
+SELF_EVALUATION_PROPERTIES = {
+    "self_evaluation": {"type": "string", "enum": ["PASS", "NEEDS_IMPROVEMENT", "FAIL"]},
+    "self_feedback": {"type": "string"},
+}
+
+def _json_schema_format(name: str, properties: Dict) -> Dict:
+    """response_format for strict structured outputs over the given properties"""
+    if STRUCTURED_OUTPUTS_MODE == 'json_object':
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False
+            }
+        }
+    }
+
+RISK_ANALYSIS_RESPONSE_FORMAT = _json_schema_format("risk_analysis", RISK_ANALYSIS_PROPERTIES)
+SELF_EVALUATED_RESPONSE_FORMAT = _json_schema_format(
+    "self_evaluated_risk_analysis", {**RISK_ANALYSIS_PROPERTIES, **SELF_EVALUATION_PROPERTIES}
+)
+
+def _group_schema_format(name: str, properties: Dict) -> Dict:
+    """response_format for an "analyses" array of per-article objects (multi-article prompts)"""
+    item_properties = {"article_id": {"type": "string"}, **properties}
+    return _json_schema_format(name, {
+        "analyses": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": item_properties,
+                "required": list(item_properties),
+                "additionalProperties": False
+            }
+        }
+    })
+
+GROUP_RESPONSE_FORMAT = _group_schema_format("risk_analyses", RISK_ANALYSIS_PROPERTIES)
+SELF_EVALUATED_GROUP_RESPONSE_FORMAT = _group_schema_format(
+    "self_evaluated_risk_analyses", {**RISK_ANALYSIS_PROPERTIES, **SELF_EVALUATION_PROPERTIES}
+)
+
+# Generator/evaluator prompts, built once at import; only the str.format slots vary per call.
+# Constant instructions come first and per-article inputs last so consecutive requests
+# share a long identical prefix, which OpenAI's automatic prompt caching discounts.
+_GEN_SYSTEM_PROMPT = """You are a financial risk analyst specializing in international banking and financial risk.
         Analyze news articles for financial risk impact and provide comprehensive risk assessment.
         
         Think through your analysis step by step, then provide your final assessment.
         
-        Return your response in this format:
-        
-        <thoughts>
-        Your reasoning process, analysis approach, and key considerations for this risk assessment.
-        Explain why you chose specific risk categories, severity levels, and confidence scores.
-        </thoughts>
-        
-        <response>
-        {Valid JSON with risk analysis as specified in the user prompt}
-        </response>"""
-        
-        # Get recent scoring context for relative comparison
-        scoring_context = get_recent_scoring_context(limit=50)
-        
-        user_prompt = f"""
-        {scoring_context}
-        
-        CURRENT NEWS TO ANALYZE:
-        Headline: {news_data['headline']}
-        Content: {news_data['story'][:2000]}
-        Source: {news_data['newsSource']}
-        
+        """
+
+_GEN_INSTRUCTIONS = """
         IMPORTANT: 
         1. For the historical_impact_analysis field, research and analyze similar past events and their specific impacts on international banks. Include concrete examples, dates, and outcomes when possible.
-        2. Score the current news RELATIVE to the recent articles above. Consider:
+        2. Score the current news RELATIVE to the recent articles provided below. Consider:
            - Is this more/less severe than similar recent events?
            - How does the impact compare to recent market-moving events?
            - What's the appropriate sentiment relative to recent negative news?
            - Use the recent articles as your baseline for scoring consistency.
         
-        {feedback_context}
-        
         Return JSON with exactly this JSON format:
         // All numeric fields must be returned as numbers, not strings, in the JSON.
         {{
@@ -123,7 +200,7 @@ class RiskAnalysisEvaluatorOptimizer:
             "geographic_regions": ["geographic_regions_here"],
             "industry_sectors": ["industry_sectors_here"],
             "countries": ["countries_here"],
-            "coordinates": {"lat": "LATITUDE_HERE", "lng": "LONGITUDE_HERE"},
+            "coordinates": {{"lat": "LATITUDE_HERE", "lng": "LONGITUDE_HERE"}},
             "affected_markets": ["affected_markets_here"],
             "keywords": ["keywords_here"],
             "entities": ["entities_here"],
@@ -137,7 +214,7 @@ class RiskAnalysisEvaluatorOptimizer:
         }}
         
         CRITICAL REQUIREMENTS:
-        - RELATIVE SCORING: Use the recent articles context above as your baseline for consistent scoring
+        - RELATIVE SCORING: Use the recent articles context below as your baseline for consistent scoring
         - primary_risk_category: Select ONLY ONE primary category that represents the main risk
         - secondary_risk_categories: Include ALL other relevant risk categories that also apply (can be empty array)
         - For comprehensive risk monitoring, identify ALL relevant risk categories, not just the most obvious one
@@ -147,58 +224,40 @@ class RiskAnalysisEvaluatorOptimizer:
         - coordinates: lat/lng for PRIMARY affected country
         - keywords: 5-10 key financial terms (lowercase)
         - entities: 3-8 key people/organizations
-        - is_market_moving: TRUE only for significant market impact events (compare to recent market-moving events above)
+        - is_market_moving: TRUE only for significant market impact events (compare to recent market-moving events below)
         - requires_action: TRUE only for immediate risk management needs
         - description: 2-3 sentences explaining your reasoning for key decisions
         - historical_impact_analysis: 3-4 sentences analyzing how similar events in the past have specifically affected international banks. Include concrete examples like "During the 2008 financial crisis, similar mortgage-related news led to X% losses at major banks like..." or "When central banks previously raised rates in similar circumstances, banks experienced..." Focus on actionable historical insights.
         """
+
+_GEN_USER_TEMPLATE = _GEN_INSTRUCTIONS + """
+        {scoring_context}
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        
-        # Use util.py for LLM call
-        content = llm_call(messages, temperature=0.1)
-        
-        # Extract thoughts and response using util.py
-        thoughts = extract_xml(content, "thoughts")
-        response_json = extract_xml(content, "response")
-        
-        if not thoughts or not response_json:
-            raise Exception("Generator failed to produce properly formatted response with XML tags")
-        
-        # Parse JSON using util.py
-        risk_analysis = parse_json_from_xml(response_json)
-        
-        # Validate using util.py
-        risk_analysis = validate_risk_analysis(risk_analysis)
-        
-        print(f"\n=== GENERATION START ===")
-        print(f"Thoughts:\n{thoughts}\n")
-        print(f"Generated Risk Analysis:")
-        print(f"  Primary Category: {risk_analysis.get('primary_risk_category', 'N/A')}")
-        print(f"  Secondary Categories: {risk_analysis.get('secondary_risk_categories', [])}")
-        print(f"  Severity: {risk_analysis.get('severity_level', 'N/A')}")
-        print(f"  Confidence: {risk_analysis.get('confidence_score', 'N/A')}%")
-        print(f"  Market Moving: {risk_analysis.get('is_market_moving', 'N/A')}")
-        print(f"=== GENERATION END ===\n")
+        CURRENT NEWS TO ANALYZE:
+        Headline: {headline}
+        Content: {story}
+        Source: {source}
         
-        return thoughts, risk_analysis
-    
-    def evaluate_risk_analysis(self, risk_analysis: Dict, news_data: Dict, original_task: str) -> Tuple[str, str]:
+        {feedback_context}
         """
-        Evaluator: Assess quality of risk analysis and provide feedback using OpenAI via util.py.
+
+# Several articles in one generator prompt (generate_group_responses): the instructions
+# and scoring context are sent once for the whole group
+_GEN_GROUP_USER_TEMPLATE = _GEN_INSTRUCTIONS + """
+        {scoring_context}
         
-        Args:
-            risk_analysis: Generated risk analysis to evaluate
-            news_data: Original news data
-            original_task: Description of the analysis task
-            
-        Returns:
-            Tuple of (evaluation_status, feedback)
+        NEWS ARTICLES TO ANALYZE (assess each one independently):
+        {articles}
         """
-        system_prompt = """You are a senior financial risk assessment auditor with expertise in banking regulations, 
+
+_GEN_GROUP_ARTICLE_TEMPLATE = """
+        <article id="{article_id}">
+        Headline: {headline}
+        Content: {story}
+        Source: {source}
+        </article>"""
+
+_EVAL_SYSTEM_PROMPT = """You are a senior financial risk assessment auditor with expertise in banking regulations, 
         market analysis, and risk management frameworks. Your role is to evaluate risk analyses for:
         
         1. Accuracy and logical consistency
@@ -211,20 +270,20 @@ class RiskAnalysisEvaluatorOptimizer:
         
         You should be thorough but fair. Only pass analyses that meet professional standards.
         Output your evaluation in the specified format."""
-        
-        user_prompt = f"""
-        Evaluate this risk analysis for the given news article:
-        
-        Original News:
-        Headline: {news_data['headline']}
-        Content: {news_data['story'][:1000]}...
-        Source: {news_data['newsSource']}
-        
-        Risk Analysis to Evaluate:
-        {json.dumps(risk_analysis, indent=2)}
-        
-        Original Task: {original_task}
-        
+
+# The analysis task, as shown to the evaluator
+_TASK_DESCRIPTION = """
+    Analyze banking/financial news for comprehensive risk assessment including:
+    - Accurate risk categorization and severity assessment and sentiment analysis with justification
+    - Realistic financial exposure estimates
+    - Proper confidence scoring based on information quality  
+    - Correct identification of market-moving events
+    - Appropriate action requirements for risk management
+    - Historical impact analysis
+    """
+
+# Criteria shared by every evaluator prompt
+_EVAL_CRITERIA = """
         Evaluate based on these criteria:
         1. Risk categorization accuracy (is the primary risk category appropriate?)
         2. Severity assessment (does severity match the actual impact described?)
@@ -238,7 +297,12 @@ class RiskAnalysisEvaluatorOptimizer:
         Output PASS only if all criteria are well met with minor or no issues.
         Output NEEDS_IMPROVEMENT if there are significant issues but the analysis is salvageable.
         Output FAIL if there are fundamental errors that require complete rework.
-        
+        """
+
+# Rubric shared by the full and the diff evaluator prompts (so both hit the same cached prefix)
+_EVAL_RUBRIC = """
+        Evaluate the risk analysis below for the given news article.
+        """ + _EVAL_CRITERIA + """
         Provide your response in this exact format:
         
         <evaluation>PASS, NEEDS_IMPROVEMENT, or FAIL</evaluation>
@@ -247,37 +311,789 @@ class RiskAnalysisEvaluatorOptimizer:
         Focus on the most critical issues first.
         </feedback>
         """
+
+_EVAL_USER_TEMPLATE = _EVAL_RUBRIC + """
+        Original Task: {original_task}
+        
+        Original News:
+        Headline: {headline}
+        Content: {story}...
+        Source: {source}
+        
+        Risk Analysis to Evaluate:
+        {risk_analysis}
+        """
+
+# Iteration 2+: the article and unchanged fields were already reviewed, so only the changes are sent
+_EVAL_DIFF_USER_TEMPLATE = _EVAL_RUBRIC + """
+        Original Task: {original_task}
+        
+        Headline: {headline}
+        
+        You previously evaluated an earlier version of this analysis as {previous_evaluation} with this feedback:
+        {previous_feedback}
+        
+        The revised analysis changes only the fields below (before/after values); every other field
+        is unchanged from the version you evaluated. Evaluate the revised analysis as a whole:
+        {changes}
+        """
+
+# Best-of-N first attempt: one evaluator call picks the best candidate and grades it.
+# The choice comes first so the PASS cut-off (EVALUATION_PASS_PATTERN) still sees it.
+_EVAL_SELECTION_USER_TEMPLATE = """
+        Several candidate risk analyses were generated for the news article below.
+        Choose the best candidate, then evaluate the one you chose.
+        """ + _EVAL_CRITERIA + """
+        Provide your response in this exact format:
+        
+        <choice>Number of the best candidate</choice>
+        <evaluation>PASS, NEEDS_IMPROVEMENT, or FAIL</evaluation>
+        <feedback>
+        Specific, actionable feedback on what needs improvement in the chosen candidate and why.
+        Focus on the most critical issues first.
+        </feedback>
+        
+        Original Task: {original_task}
+        
+        Original News:
+        Headline: {headline}
+        Content: {story}...
+        Source: {source}
+        
+        Candidate Risk Analyses:
+        {candidates}
+        """
+
+# Output format section of the generator system prompt
+GENERATOR_XML_FORMAT = """Return your response in this format:
+        
+        <thoughts>
+        Your reasoning process, analysis approach, and key considerations for this risk assessment.
+        Explain why you chose specific risk categories, severity levels, and confidence scores.
+        </thoughts>
+        
+        <response>
+        {Valid JSON with risk analysis as specified in the user prompt}
+        </response>"""
+
+GENERATOR_JSON_FORMAT = """Return a single JSON object with the risk analysis fields specified in the user prompt.
+        Put your reasoning process, analysis approach, and key considerations in the "reasoning" field,
+        explaining why you chose specific risk categories, severity levels, and confidence scores."""
+
+# Output format sections for multi-article prompts: one block (or array item) per article id
+GENERATOR_GROUP_XML_FORMAT = """Analyze each article independently and return one block per article, using its id:
+        
+        <analysis id="ARTICLE_ID">
+        <thoughts>
+        Your reasoning process, analysis approach, and key considerations for this article's risk assessment.
+        Explain why you chose specific risk categories, severity levels, and confidence scores.
+        </thoughts>
+        
+        <response>
+        {Valid JSON with risk analysis as specified in the user prompt}
+        </response>
+        </analysis>"""
+
+GENERATOR_GROUP_JSON_FORMAT = """Analyze each article independently and return a JSON object whose "analyses" array holds
+        one risk analysis per article, with the article's id in "article_id" and the risk analysis fields
+        specified in the user prompt. Put your reasoning process for each article in its "reasoning" field,
+        explaining why you chose specific risk categories, severity levels, and confidence scores."""
+
+# Self-audit instructions for multi-article XML output (the tags go inside each analysis block)
+GROUP_SELF_EVALUATION_INSTRUCTIONS = """
+        
+        After each response, audit that analysis as a senior financial risk assessment auditor would:
+        check risk categorization, severity, confidence scoring, market impact, action requirement,
+        financial exposure realism, geographic/entity accuracy and the quality of the description.
+        Then add, before the closing </analysis> tag:
+        
+        <self_evaluation>PASS, NEEDS_IMPROVEMENT, or FAIL</self_evaluation>
+        <self_feedback>
+        Specific, actionable feedback on what needs improvement and why (or why it passes).
+        </self_feedback>"""
+
+# Self-audit instructions for structured outputs (fields instead of XML tags)
+SELF_EVALUATION_JSON_INSTRUCTIONS = """
+        
+        Finally, audit your own analysis as a senior financial risk assessment auditor would:
+        check risk categorization, severity, confidence scoring, market impact, action requirement,
+        financial exposure realism, geographic/entity accuracy and the quality of the description.
+        Set "self_evaluation" to PASS, NEEDS_IMPROVEMENT, or FAIL and "self_feedback" to specific,
+        actionable feedback on what needs improvement and why (or why it passes)."""
+
+# Complete generator system prompts, assembled once: (structured, self_evaluate) -> prompt
+_GEN_SYSTEM_PROMPTS = {
+    (False, False): _GEN_SYSTEM_PROMPT + GENERATOR_XML_FORMAT,
+    (False, True): _GEN_SYSTEM_PROMPT + GENERATOR_XML_FORMAT + SELF_EVALUATION_INSTRUCTIONS,
+    (True, False): _GEN_SYSTEM_PROMPT + GENERATOR_JSON_FORMAT,
+    (True, True): _GEN_SYSTEM_PROMPT + GENERATOR_JSON_FORMAT + SELF_EVALUATION_JSON_INSTRUCTIONS,
+}
+_GEN_GROUP_SYSTEM_PROMPTS = {
+    (False, False): _GEN_SYSTEM_PROMPT + GENERATOR_GROUP_XML_FORMAT,
+    (False, True): _GEN_SYSTEM_PROMPT + GENERATOR_GROUP_XML_FORMAT + GROUP_SELF_EVALUATION_INSTRUCTIONS,
+    (True, False): _GEN_SYSTEM_PROMPT + GENERATOR_GROUP_JSON_FORMAT,
+    (True, True): _GEN_SYSTEM_PROMPT + GENERATOR_GROUP_JSON_FORMAT + SELF_EVALUATION_JSON_INSTRUCTIONS,
+}
+
+# Independent evaluator model (model name, or deployment name on Azure). Its job is a
+# PASS/NEEDS_IMPROVEMENT/FAIL verdict plus a few sentences, which a small model handles
+# well; on Azure it defaults to the generator deployment since deployment names vary.
+EVALUATOR_MODEL = os.getenv('EVALUATOR_MODEL') or (
+    None if os.getenv('LLM_PROVIDER', 'openai').lower() == 'azure' else 'gpt-4o-mini'
+)
+
+# Output cap for the evaluator: a one-word verdict and feedback of typically < 150 tokens
+EVALUATOR_MAX_TOKENS = int(os.getenv('EVALUATOR_MAX_TOKENS', '200'))
+
+# The XML generator is streamed and cut off at the end of its last useful tag, so trailing
+# tokens after it are neither waited for nor generated (the stream is closed)
+GENERATION_END_PATTERN = r"</response>"
+SELF_EVALUATED_GENERATION_END_PATTERN = r"</self_feedback>"
+
+# The evaluator is streamed and cut off once this matches: on PASS the feedback is unused,
+# so there is no point waiting for it to be generated
+EVALUATION_PASS_PATTERN = r"<evaluation>\s*PASS\s*</evaluation>"
+
+# Stop iterating early when FAIL feedback keeps repeating (the generator can't address it):
+# feedback this similar to the previous attempt's counts as no progress, and after this many
+# such attempts in a row the loop gives up so the Huey retry starts sooner
+FEEDBACK_SIMILARITY_THRESHOLD = 0.9
+MAX_NONIMPROVING_ITERATIONS = 1
+
+# Article text budget (tokens) in the generator and evaluator prompts
+GENERATOR_STORY_TOKENS = 500
+EVALUATOR_STORY_TOKENS = 250
+
+# Accept a first attempt without the independent evaluator when it has no self-evaluation
+# verdict and passes _cheap_quality_check (the evaluator still runs on anything flagged)
+HEURISTIC_PRECHECK = os.getenv('HEURISTIC_PRECHECK', 'true').lower() == 'true'
+
+# Feedback recorded when the pre-check stands in for the evaluator
+PRECHECK_FEEDBACK = "Heuristic pre-check passed; evaluator skipped"
+
+# Response parsers, compiled once. The evaluator verdict and feedback come from a single scan;
+# feedback may be cut off by max_tokens or missing entirely after a streamed PASS
+_EVAL_RE = re.compile(
+    r"<evaluation>\s*(PASS|NEEDS_IMPROVEMENT|FAIL)\s*</evaluation>"
+    r"(?:\s*<feedback>\s*(.*?)\s*(?:</feedback>|$))?",
+    re.DOTALL | re.IGNORECASE
+)
+_GENERATION_RE = re.compile(
+    r"<thoughts>\s*(.*?)\s*</thoughts>.*?<response>\s*(.*?)\s*</response>",
+    re.DOTALL | re.IGNORECASE
+)
+_SELF_EVALUATION_RE = re.compile(
+    r"<self_evaluation>\s*(.*?)\s*</self_evaluation>(?:\s*<self_feedback>\s*(.*?)\s*</self_feedback>)?",
+    re.DOTALL | re.IGNORECASE
+)
+
+_CHOICE_RE = re.compile(r"<choice>\s*(?:candidate\s*)?(\d+)\s*</choice>", re.IGNORECASE)
+_GROUP_ANALYSIS_RE = re.compile(
+    r"<analysis\s+id=\"?([^\">]+?)\"?\s*>(.*?)</analysis>",
+    re.DOTALL | re.IGNORECASE
+)
+
+# Keep thoughts, full analysis and feedback of every attempt in iteration_history
+# (otherwise only iteration/evaluation are kept, which is all callers read)
+DEBUG_HISTORY = os.getenv('RISK_DEBUG_HISTORY', 'false').lower() == 'true'
+
+# The recent-articles scoring context changes slowly: rebuild it at most once per this many seconds
+SCORING_CONTEXT_TTL = int(os.getenv('SCORING_CONTEXT_TTL', '60'))
+
+# Finished analyses keyed on the article text, so a replayed/syndicated copy or a Huey retry
+# after a later step failed (theme classification, saving) skips the LLM workflow.
+# Stored in the LLM response cache backend (LLM_CACHE_BACKEND).
+ANALYSIS_CACHE = os.getenv('ANALYSIS_CACHE', 'true').lower() == 'true'
+ANALYSIS_CACHE_TTL = int(os.getenv('ANALYSIS_CACHE_TTL', '86400'))
+_analysis_cache = create_llm_cache(ttl=ANALYSIS_CACHE_TTL) if ANALYSIS_CACHE else None
+
+# Async single-attempt runs (max_iterations=1): generate this many candidates concurrently at
+# rising temperatures (0.1, 0.3, ...) and let one evaluator call pick the best, instead of
+# a FAIL sending the whole article back through a Huey retry. 1 disables it.
+BEST_OF_CANDIDATES = int(os.getenv('BEST_OF_CANDIDATES', '1'))
+
+# Overlap generation N+1 with evaluation N in the async loop (only matters when max_iterations > 1)
+SPECULATIVE_GENERATION = os.getenv('SPECULATIVE_GENERATION', 'false').lower() == 'true'
+# Temperature added per iteration for speculative attempts (0.3, 0.5, ...)
+SPECULATIVE_TEMPERATURE_STEP = 0.2
+
+
+# Legend for the compact rows built by get_recent_scoring_context
+SCORING_CONTEXT_HEADER = (
+    "RECENT ARTICLES FOR RELATIVE SCORING COMPARISON\n"
+    "(#|severity C/H/M/L|sentiment|impact|primary category, first 3 letters|M=market-moving, N=not|summary):\n"
+)
+
+# limit -> (expires_at, fingerprint, context) for get_recent_scoring_context
+_scoring_context_cache = {}
+
+# Changes whenever an article is added (or the newest one removed); both are index seeks
+_SCORING_CONTEXT_FINGERPRINT_SQL = "SELECT MAX(id), MAX(published_date) FROM news_articles"
+
+
+def get_recent_scoring_context(limit=50):
+    """
+    Get recent articles with scores for relative comparison.
+    
+    Cached per process for SCORING_CONTEXT_TTL seconds, so a burst of articles
+    (and every iteration within one) shares a single query. When the TTL runs
+    out, a fingerprint query decides whether the rows need reading again.
+    """
+    cached = _scoring_context_cache.get(limit)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[2]
+    
+    try:
+        conn = get_conn()
+        fingerprint = tuple(conn.execute(_SCORING_CONTEXT_FINGERPRINT_SQL).fetchone())
+        if cached is not None and cached[1] == fingerprint:
+            _scoring_context_cache[limit] = (time.monotonic() + SCORING_CONTEXT_TTL, fingerprint, cached[2])
+            return cached[2]
+        
+        articles = conn.execute("""
+            SELECT summary, severity_level, sentiment_score, impact_score,
+                   primary_risk_category, is_market_moving
+            FROM news_articles 
+            ORDER BY published_date DESC
+            LIMIT ?
+        """, [limit]).fetchall()
+        
+        if not articles:
+            return "No recent articles for comparison."
+        
+        # One compact line per article: the model only needs coarse priors, and this
+        # block is part of every generator prompt
+        context = SCORING_CONTEXT_HEADER + "".join(
+            f"{i}|{art['severity_level'][0]}|{art['sentiment_score']:.1f}|{art['impact_score']}|"
+            f"{art['primary_risk_category'][:3]}|{'M' if art['is_market_moving'] else 'N'}|"
+            f"{art['summary'][:50]}\n"
+            for i, art in enumerate(articles, 1)
+        )
+    except Exception as e:
+        # Not cached, so the next call retries the query
+        return f"Context unavailable: {e}"
+    
+    _scoring_context_cache[limit] = (time.monotonic() + SCORING_CONTEXT_TTL, fingerprint, context)
+    return context
+
+
+def _story_excerpts(news_data: Dict) -> Tuple[str, str]:
+    """
+    Token-truncated story for the generator and evaluator prompts.
+    
+    Tokenized once per story text, so later iterations (and the evaluator)
+    reuse it without adding anything to news_data, which is re-enqueued as
+    the Huey payload.
+    """
+    return _truncate_story(news_data['story'])
+
+
+@lru_cache(maxsize=256)
+def _truncate_story(story: str) -> Tuple[str, str]:
+    """(generator excerpt, evaluator excerpt) of a story"""
+    return truncate_tokens(story, GENERATOR_STORY_TOKENS, EVALUATOR_STORY_TOKENS)
+
+
+def _cheap_quality_check(risk_analysis: Dict, news_data: Dict) -> Optional[str]:
+    """
+    Heuristic screen for obviously incomplete or implausible analyses.
+    
+    Args:
+        risk_analysis: Validated risk analysis
+        news_data: Original news data
+        
+    Returns:
+        None if the analysis looks fine, otherwise the reason it needs the evaluator
+    """
+    if not 50 <= risk_analysis.get('confidence_score', 0) <= 95:
+        return f"confidence_score {risk_analysis.get('confidence_score')} outside 50-95"
+    if risk_analysis.get('primary_risk_category') not in RISK_CATEGORIES:
+        return "unknown primary_risk_category"
+    
+    try:
+        if float(risk_analysis.get('financial_exposure', 0)) < 0:
+            return "negative financial_exposure"
+    except (TypeError, ValueError):
+        return "non-numeric financial_exposure"
+    
+    summary = (risk_analysis.get('summary') or '').strip()
+    if not summary or summary == news_data['headline'].strip():
+        return "summary missing or copied from headline"
+    if len((risk_analysis.get('description') or '').strip()) <= 50:
+        return "description too short"
+    
+    coordinates = risk_analysis.get('coordinates') or {}
+    try:
+        lat, lng = float(coordinates['lat']), float(coordinates['lng'])
+    except (KeyError, TypeError, ValueError):
+        return "coordinates missing or non-numeric"
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+        return "implausible coordinates"
+    
+    return None
+
+
+class RiskAnalysisEvaluatorOptimizer:
+    """
+    Evaluator-Optimizer workflow following the Anthropic cookbook pattern.
+    Generator creates risk analysis, Evaluator provides feedback, loop until acceptable.
+    """
+    
+    def __init__(self, max_iterations: int = 1, speculative: bool = False,
+                 self_evaluate: bool = SELF_EVALUATION, structured: bool = STRUCTURED_OUTPUTS,
+                 generator_model: str = None, evaluator_model: str = EVALUATOR_MODEL,
+                 evaluator_max_tokens: int = EVALUATOR_MAX_TOKENS, precheck: bool = HEURISTIC_PRECHECK,
+                 best_of: int = BEST_OF_CANDIDATES):
+        """
+        Initialize the Evaluator-Optimizer system.
+        
+        Args:
+            max_iterations: Maximum number of improvement iterations
+            speculative: In the async loop, start the next generation while the
+                evaluator is still running (see aoptimize_risk_analysis)
+            self_evaluate: Generate and self-evaluate in one call, only running the
+                independent evaluator when the self-evaluation is FAIL
+            structured: Request JSON-schema structured outputs instead of XML-wrapped JSON
+            generator_model: Model/deployment for generation (None uses the configured default)
+            evaluator_model: Model/deployment for the independent evaluator (None uses the configured default)
+            evaluator_max_tokens: Completion token cap for the evaluator
+            precheck: Accept a first attempt without a self-evaluation verdict when
+                _cheap_quality_check finds nothing to flag, skipping the evaluator
+            best_of: Candidates generated concurrently for a single-attempt async run
+                (see aoptimize_risk_analysis); 1 generates just one
+        """
+        self.max_iterations = max_iterations
+        self.speculative = speculative
+        self.self_evaluate = self_evaluate
+        self.structured = structured
+        self.generator_model = generator_model
+        self.evaluator_model = evaluator_model
+        self.evaluator_max_tokens = evaluator_max_tokens
+        self.precheck = precheck
+        self.best_of = best_of
+        # Every LLM request (messages, llm_call options) of the current run, so a FAILed
+        # run can evict all of its generations and verdicts from the response cache
+        self._requests = []
+        # Consecutive FAILs whose feedback repeats the previous attempt's
+        self.num_consecutive_nonimproving = 0
+    
+    def generate_risk_analysis(self, news_data: Dict, feedback_context: str = "",
+                               temperature: float = 0.1) -> Tuple[str, Dict]:
+        """
+        Generator: Create risk analysis from news data using OpenAI via util.py.
+        
+        Args:
+            news_data: News article data
+            feedback_context: Previous feedback for improvement context
+            temperature: Sampling temperature (raised for best-of-N candidates)
+            
+        Returns:
+            Tuple of (reasoning, risk_analysis_dict)
+        """
+        messages = self._build_generation_messages(news_data, feedback_context)
+        request = self._generation_request(RISK_ANALYSIS_RESPONSE_FORMAT, GENERATION_END_PATTERN, temperature)
+        self._requests.append((messages, request))
+        content = llm_call(messages, **request)
+        return self._parse_or_discard(messages, content, self._parse_generation, **request)
+    
+    async def agenerate_risk_analysis(self, news_data: Dict, feedback_context: str = "",
+                                      temperature: float = 0.1) -> Tuple[str, Dict]:
+        """Async generate_risk_analysis for concurrent batch processing"""
+        messages = self._build_generation_messages(news_data, feedback_context)
+        request = self._generation_request(RISK_ANALYSIS_RESPONSE_FORMAT, GENERATION_END_PATTERN, temperature)
+        self._requests.append((messages, request))
+        content = await llm_call_async(messages, **request)
+        return self._parse_or_discard(messages, content, self._parse_generation, **request)
+    
+    def generate_and_self_evaluate(self, news_data: Dict, feedback_context: str = "",
+                                   temperature: float = 0.1) -> Tuple[str, Dict, str, str]:
+        """
+        Generator with self-critique: one call returns the analysis and its own evaluation.
         
-        messages = [
+        Args:
+            news_data: News article data
+            feedback_context: Previous feedback for improvement context
+            temperature: Sampling temperature (raised for best-of-N candidates)
+            
+        Returns:
+            Tuple of (reasoning, risk_analysis_dict, self_evaluation, self_feedback);
+            the last two are None if the model omitted them
+        """
+        messages = self._build_self_evaluation_messages(news_data, feedback_context)
+        request = self._generation_request(
+            SELF_EVALUATED_RESPONSE_FORMAT, SELF_EVALUATED_GENERATION_END_PATTERN, temperature
+        )
+        self._requests.append((messages, request))
+        content = llm_call(messages, **request)
+        return self._parse_or_discard(messages, content, self._parse_self_evaluation, **request)
+    
+    async def agenerate_and_self_evaluate(self, news_data: Dict, feedback_context: str = "",
+                                          temperature: float = 0.1) -> Tuple[str, Dict, str, str]:
+        """Async generate_and_self_evaluate for concurrent batch processing"""
+        messages = self._build_self_evaluation_messages(news_data, feedback_context)
+        request = self._generation_request(
+            SELF_EVALUATED_RESPONSE_FORMAT, SELF_EVALUATED_GENERATION_END_PATTERN, temperature
+        )
+        self._requests.append((messages, request))
+        content = await llm_call_async(messages, **request)
+        return self._parse_or_discard(messages, content, self._parse_self_evaluation, **request)
+    
+    def _generate_candidate(self, news_data: Dict, feedback_context: str) -> Tuple[str, Dict, str, str]:
+        """One generation step (self-evaluated or not) as (thoughts, analysis, verdict, feedback)"""
+        if self.self_evaluate:
+            return self.generate_and_self_evaluate(news_data, feedback_context)
+        return self.generate_risk_analysis(news_data, feedback_context) + (None, None)
+    
+    async def _agenerate_candidate(self, news_data: Dict, feedback_context: str,
+                                   temperature: float = 0.1) -> Tuple[str, Dict, str, str]:
+        """Async _generate_candidate"""
+        if self.self_evaluate:
+            return await self.agenerate_and_self_evaluate(news_data, feedback_context, temperature)
+        return await self.agenerate_risk_analysis(news_data, feedback_context, temperature) + (None, None)
+    
+    def _generation_request(self, response_format: Dict, stop_pattern: str, temperature: float) -> Dict:
+        """llm_call options for a generator call: a response schema, or a streamed XML cut-off"""
+        if self.structured:
+            return {"model": self.generator_model, "temperature": temperature, "response_format": response_format}
+        return {"model": self.generator_model, "temperature": temperature, "stop_pattern": stop_pattern}
+    
+    def _parse_or_discard(self, messages: List[Dict], content: str, parser, **request):
+        """
+        Parse an LLM response, evicting it from the response cache if it is malformed.
+        
+        `request` holds the llm_call options (model, temperature, response_format,
+        max_tokens, ...) the response was cached under; temperature defaults to 0.1.
+        """
+        try:
+            return parser(content)
+        except Exception:
+            discard_cached_response(messages, **{"temperature": 0.1, **request})
+            raise
+    
+    def _build_self_evaluation_messages(self, news_data: Dict, feedback_context: str) -> List[Dict]:
+        """Generator prompt with the self-audit instructions appended to the system prompt"""
+        return self._build_generation_messages(news_data, feedback_context, self_evaluate=True)
+    
+    def _parse_self_evaluation(self, content: str) -> Tuple[str, Dict, str, str]:
+        """Parse the generator output plus the optional self-evaluation verdict and feedback"""
+        thoughts, risk_analysis, self_evaluation, self_feedback = self._extract_generation(content)
+        risk_analysis = self._validate_generation(thoughts, risk_analysis)
+        
+        if self_evaluation:
+            self_evaluation = self_evaluation.strip().upper()
+            logger.info("🪞 Self-evaluation: %s", self_evaluation)
+        
+        return thoughts, risk_analysis, self_evaluation, self_feedback or ""
+    
+    def _build_generation_messages(self, news_data: Dict, feedback_context: str,
+                                   self_evaluate: bool = False) -> List[Dict]:
+        """Generator prompt for one article (plus any feedback from earlier attempts)"""
+        system_prompt = _GEN_SYSTEM_PROMPTS[(self.structured, self_evaluate)]
+        
+        user_prompt = _GEN_USER_TEMPLATE.format_map({
+            # Recent scoring context for relative comparison
+            "scoring_context": get_recent_scoring_context(limit=50),
+            "headline": news_data['headline'],
+            "story": _story_excerpts(news_data)[0],
+            "source": news_data['newsSource'],
+            "feedback_context": feedback_context,
+        })
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _build_group_generation_messages(self, news_list: List[Dict]) -> List[Dict]:
+        """Generator prompt covering several articles, identified by their position (1..K)"""
+        system_prompt = _GEN_GROUP_SYSTEM_PROMPTS[(self.structured, bool(self.self_evaluate))]
+        
+        articles = "".join(
+            _GEN_GROUP_ARTICLE_TEMPLATE.format_map({
+                "article_id": article_id,
+                "headline": news_data['headline'],
+                "story": _story_excerpts(news_data)[0],
+                "source": news_data['newsSource'],
+            })
+            for article_id, news_data in enumerate(news_list, 1)
+        )
+        user_prompt = _GEN_GROUP_USER_TEMPLATE.format_map({
+            "scoring_context": get_recent_scoring_context(limit=50),
+            "articles": articles,
+        })
+        
+        return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
+    
+    def _split_group_response(self, content: str, news_list: List[Dict]) -> Dict[str, str]:
+        """
+        Split a multi-article generator response into single-article responses.
         
-        # Use util.py for LLM call
-        content = llm_call(messages, temperature=0.1)
+        Each piece has the same format as a one-article generation, so it can be
+        passed on as an initial_response and parsed by _parse_initial_response.
+        """
+        if self.structured:
+            try:
+                analyses = _json_loads(content).get("analyses", [])
+            except (json.JSONDecodeError, AttributeError) as e:
+                raise Exception(f"Generator returned invalid structured output: {e}")
+            pieces = [(str(analysis.pop("article_id", "")), _compact_json(analysis)) for analysis in analyses]
+        else:
+            pieces = _GROUP_ANALYSIS_RE.findall(content or "")
         
-        # Extract evaluation and feedback using util.py
-        evaluation = extract_xml(content, "evaluation")
-        feedback = extract_xml(content, "feedback")
+        responses = {}
+        for article_id, response in pieces:
+            article_id = article_id.strip()
+            if article_id.isdigit() and 1 <= int(article_id) <= len(news_list):
+                responses[news_list[int(article_id) - 1]['newsId']] = response
         
-        if not evaluation or not feedback:
-            print(f"❌ XML PARSING ERROR in evaluator:")
-            print(f"Raw LLM response:\n{content}\n")
-            print(f"Extracted evaluation: '{evaluation}'")
-            print(f"Extracted feedback: '{feedback}'")
-            raise Exception("Evaluator failed to produce properly formatted response with XML tags")
+        if not responses:
+            raise Exception("Generator failed to produce a response for any article in the group")
+        if len(responses) < len(news_list):
+            logger.warning("⚠️ Grouped generation covered %d of %d articles", len(responses), len(news_list))
+        return responses
+    
+    def _parse_generation(self, content: str) -> Tuple[str, Dict]:
+        """Extract, parse and validate the generator's output"""
+        thoughts, risk_analysis, _, _ = self._extract_generation(content)
+        return thoughts, self._validate_generation(thoughts, risk_analysis)
+    
+    def _extract_generation(self, content: str) -> Tuple[str, Dict, str, str]:
+        """
+        Split a generator response into (thoughts, raw analysis, self_evaluation, self_feedback)
+        
+        Structured outputs are one JSON object; otherwise the parts come from XML tags.
+        """
+        if self.structured:
+            try:
+                risk_analysis = _json_loads(content)
+            except json.JSONDecodeError as e:
+                raise Exception(f"Generator returned invalid structured output: {e}")
+            return (
+                risk_analysis.pop("reasoning", ""),
+                risk_analysis,
+                risk_analysis.pop("self_evaluation", None),
+                risk_analysis.pop("self_feedback", None)
+            )
+        
+        # Thoughts and response in one scan
+        match = _GENERATION_RE.search(content or "")
+        if not match or not match.group(1) or not match.group(2):
+            raise Exception("Generator failed to produce properly formatted response with XML tags")
+        thoughts, response_json = match.groups()
+        
+        # Parse JSON using util.py
+        risk_analysis = parse_json_from_xml(response_json)
+        
+        self_match = _SELF_EVALUATION_RE.search(content, match.end())
+        self_evaluation, self_feedback = self_match.groups() if self_match else (None, None)
+        
+        return thoughts, risk_analysis, self_evaluation, self_feedback
+    
+    def _validate_generation(self, thoughts: str, risk_analysis: Dict) -> Dict:
+        """Validate a parsed analysis and log a summary of it"""
+        # Validate using util.py
+        risk_analysis = validate_risk_analysis(risk_analysis)
         
-        evaluation = evaluation.strip()
-        feedback = feedback.strip()
+        logger.debug(
+            "=== GENERATION ===\nThoughts:\n%s\n"
+            "Primary Category: %s | Secondary Categories: %s | Severity: %s | "
+            "Confidence: %s%% | Market Moving: %s",
+            thoughts,
+            risk_analysis.get('primary_risk_category', 'N/A'),
+            risk_analysis.get('secondary_risk_categories', []),
+            risk_analysis.get('severity_level', 'N/A'),
+            risk_analysis.get('confidence_score', 'N/A'),
+            risk_analysis.get('is_market_moving', 'N/A')
+        )
         
-        print(f"=== EVALUATION START ===")
-        print(f"Status: {evaluation}")
-        print(f"Feedback: {feedback}")
-        print(f"=== EVALUATION END ===\n")
+        return risk_analysis
+    
+    def evaluate_risk_analysis(self, risk_analysis: Dict, news_data: Dict, original_task: str) -> Tuple[str, str]:
+        """
+        Evaluator: Assess quality of risk analysis and provide feedback using OpenAI via util.py.
+        
+        Args:
+            risk_analysis: Generated risk analysis to evaluate
+            news_data: Original news data
+            original_task: Description of the analysis task
+            
+        Returns:
+            Tuple of (evaluation_status, feedback)
+        """
+        messages = self._build_evaluation_messages(risk_analysis, news_data, original_task)
+        return self._run_evaluator(messages)
+    
+    async def aevaluate_risk_analysis(self, risk_analysis: Dict, news_data: Dict, original_task: str) -> Tuple[str, str]:
+        """Async evaluate_risk_analysis for concurrent batch processing"""
+        messages = self._build_evaluation_messages(risk_analysis, news_data, original_task)
+        return await self._arun_evaluator(messages)
+    
+    def evaluate_risk_analysis_diff(self, risk_analysis: Dict, news_data: Dict, original_task: str,
+                                    previous: Tuple[Dict, str, str]) -> Tuple[str, str]:
+        """
+        Evaluator for iteration 2+: re-evaluate a revised analysis from its changes only.
+        
+        The article and the unchanged fields were part of the previous evaluation,
+        so the prompt carries just the headline, the previous verdict/feedback and
+        the changed fields. An unchanged analysis keeps its previous verdict
+        without an LLM call.
+        
+        Args:
+            risk_analysis: Revised risk analysis to evaluate
+            news_data: Original news data
+            original_task: Description of the analysis task
+            previous: (risk_analysis, evaluation, feedback) of the last evaluated analysis
+            
+        Returns:
+            Tuple of (evaluation_status, feedback)
+        """
+        messages = self._build_diff_evaluation_messages(risk_analysis, news_data, original_task, previous)
+        if messages is None:
+            return previous[1], previous[2]
+        return self._run_evaluator(messages)
+    
+    async def aevaluate_risk_analysis_diff(self, risk_analysis: Dict, news_data: Dict, original_task: str,
+                                           previous: Tuple[Dict, str, str]) -> Tuple[str, str]:
+        """Async evaluate_risk_analysis_diff"""
+        messages = self._build_diff_evaluation_messages(risk_analysis, news_data, original_task, previous)
+        if messages is None:
+            return previous[1], previous[2]
+        return await self._arun_evaluator(messages)
+    
+    async def aselect_risk_analysis(self, candidates: List[Dict], news_data: Dict,
+                                    original_task: str) -> Tuple[int, str, str]:
+        """
+        Evaluator for best-of-N: pick the best of several candidate analyses and grade it.
+        
+        Args:
+            candidates: Candidate risk analyses for the same article
+            news_data: Original news data
+            original_task: Description of the analysis task
+            
+        Returns:
+            Tuple of (index of the chosen candidate, evaluation_status, feedback)
+        """
+        messages = self._build_selection_messages(candidates, news_data, original_task)
+        options = self._evaluator_options()
+        self._requests.append((messages, {"temperature": 0.1, **options}))
+        content = await llm_call_async(messages, temperature=0.1, **options)
+        return self._parse_or_discard(messages, content,
+                                      lambda text: self._parse_selection(text, len(candidates)), **options)
+    
+    def _evaluator_options(self) -> Dict:
+        """llm_call options for the evaluator (cheaper model, capped and cut off on PASS)"""
+        return {
+            "model": self.evaluator_model,
+            "max_tokens": self.evaluator_max_tokens,
+            "stop_pattern": EVALUATION_PASS_PATTERN,
+        }
+    
+    def _run_evaluator(self, messages: List[Dict]) -> Tuple[str, str]:
+        """Call the evaluator and parse its verdict"""
+        options = self._evaluator_options()
+        self._requests.append((messages, {"temperature": 0.1, **options}))
+        content = llm_call(messages, temperature=0.1, **options)
+        return self._parse_or_discard(messages, content, self._parse_evaluation, **options)
+    
+    async def _arun_evaluator(self, messages: List[Dict]) -> Tuple[str, str]:
+        """Async _run_evaluator"""
+        options = self._evaluator_options()
+        self._requests.append((messages, {"temperature": 0.1, **options}))
+        content = await llm_call_async(messages, temperature=0.1, **options)
+        return self._parse_or_discard(messages, content, self._parse_evaluation, **options)
+    
+    def _build_diff_evaluation_messages(self, risk_analysis: Dict, news_data: Dict, original_task: str,
+                                        previous: Tuple[Dict, str, str]) -> List[Dict]:
+        """Diff evaluator prompt (None if nothing changed since the previous evaluation)"""
+        previous_analysis, previous_evaluation, previous_feedback = previous
+        changes = {
+            field: {"before": previous_analysis.get(field), "after": risk_analysis.get(field)}
+            for field in {**previous_analysis, **risk_analysis}
+            if previous_analysis.get(field) != risk_analysis.get(field)
+        }
+        if not changes:
+            logger.info("♻️ Analysis unchanged since last evaluation, keeping verdict %s", previous_evaluation)
+            return None
+        
+        user_prompt = _EVAL_DIFF_USER_TEMPLATE.format_map({
+            "original_task": original_task,
+            "headline": news_data['headline'],
+            "previous_evaluation": previous_evaluation,
+            "previous_feedback": previous_feedback,
+            "changes": _compact_json(changes),
+        })
+        
+        return [
+            {"role": "system", "content": _EVAL_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _build_evaluation_messages(self, risk_analysis: Dict, news_data: Dict, original_task: str) -> List[Dict]:
+        """Evaluator prompt for one generated analysis"""
+        user_prompt = _EVAL_USER_TEMPLATE.format_map({
+            "headline": news_data['headline'],
+            "story": _story_excerpts(news_data)[1],
+            "source": news_data['newsSource'],
+            "risk_analysis": _compact_json(risk_analysis),
+            "original_task": original_task,
+        })
+        
+        return [
+            {"role": "system", "content": _EVAL_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _build_selection_messages(self, candidates: List[Dict], news_data: Dict, original_task: str) -> List[Dict]:
+        """Evaluator prompt comparing best-of-N candidates (numbered from 1)"""
+        user_prompt = _EVAL_SELECTION_USER_TEMPLATE.format_map({
+            "original_task": original_task,
+            "headline": news_data['headline'],
+            "story": _story_excerpts(news_data)[1],
+            "source": news_data['newsSource'],
+            "candidates": "\n\n".join(
+                f"Candidate {number}:\n{_compact_json(candidate)}" for number, candidate in enumerate(candidates, 1)
+            ),
+        })
+        
+        return [
+            {"role": "system", "content": _EVAL_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _parse_selection(self, content: str, count: int) -> Tuple[int, str, str]:
+        """Extract the chosen candidate (0-based) plus the usual evaluation/feedback"""
+        match = _CHOICE_RE.search(content or "")
+        if not match or not 1 <= int(match.group(1)) <= count:
+            raise Exception(f"Evaluator failed to choose one of the {count} candidates")
+        evaluation, feedback = self._parse_evaluation(content)
+        return int(match.group(1)) - 1, evaluation, feedback
+    
+    def _parse_evaluation(self, content: str) -> Tuple[str, str]:
+        """Extract the evaluator's <evaluation>/<feedback> output"""
+        match = _EVAL_RE.search(content or "")
+        evaluation = match.group(1).upper() if match else None
+        feedback = match.group(2) if match else None
+        
+        # Streaming stops right after a PASS verdict, before any feedback
+        if evaluation == "PASS" and feedback is None:
+            feedback = ""
+        
+        if not evaluation or feedback is None:
+            logger.error(
+                "❌ XML PARSING ERROR in evaluator (evaluation=%r, feedback=%r). Raw LLM response:\n%s",
+                evaluation, feedback, content
+            )
+            raise Exception("Evaluator failed to produce properly formatted response with XML tags")
+        
+        logger.debug("=== EVALUATION ===\nStatus: %s\nFeedback: %s", evaluation, feedback)
         
         return evaluation, feedback
     
-    def optimize_risk_analysis(self, news_data: Dict, task_description: str) -> Tuple[Dict, List[Dict]]:
+    def optimize_risk_analysis(self, news_data: Dict, task_description: str,
+                               initial_response: str = None) -> Tuple[Dict, List[Dict]]:
         """
         Main optimization loop: Generate and evaluate until requirements are met.
         Following the Anthropic cookbook pattern with clean error handling.
@@ -285,79 +1101,279 @@ class RiskAnalysisEvaluatorOptimizer:
         Args:
             news_data: News article data to analyze
             task_description: Description of the analysis task
+            initial_response: Raw generator output obtained elsewhere (Batch API);
+                used as the first candidate so iteration 1 starts at evaluation
             
         Returns:
-            Tuple of (final_risk_analysis, iteration_history)
+            Tuple of (final_risk_analysis, iteration_history); history entries hold
+            iteration and evaluation (plus thoughts/analysis/feedback with RISK_DEBUG_HISTORY)
             
         Raises:
             Exception: If all iterations fail (to be handled by Huey retries)
         """
-        print(f"🔄 Starting Evaluator-Optimizer workflow for news: {news_data['newsId']}")
+        logger.info("🔄 Starting Evaluator-Optimizer workflow for news: %s", news_data['newsId'])
         
         iteration_history = []
         previous_feedback = []
+        self.num_consecutive_nonimproving = 0
+        self._requests = []
+        # (risk_analysis, evaluation, feedback) of the last independently evaluated candidate
+        evaluated = None
         
         for iteration in range(1, self.max_iterations + 1):
-            print(f"\n--- ITERATION {iteration} ---")
+            logger.debug("--- ITERATION %d (%s) ---", iteration, news_data['newsId'])
             
-            # Build feedback context from previous attempts
-            feedback_context = ""
-            if previous_feedback:
-                feedback_context = "\nPrevious evaluation feedback to address:\n"
-                for i, prev in enumerate(previous_feedback, 1):
-                    feedback_context += f"Attempt {i} feedback: {prev}\n"
-                feedback_context += "\nPlease address the above feedback and improve your analysis.\n"
+            # Generate risk analysis (with self-evaluation when enabled)
+            candidate = None
+            if iteration == 1 and initial_response:
+                candidate = self._parse_initial_response(initial_response)
+            if candidate is None:
+                feedback_context = self._build_feedback_context(previous_feedback)
+                candidate = self._generate_candidate(news_data, feedback_context)
+            thoughts, risk_analysis, evaluation, feedback = candidate
             
-            # Generate risk analysis
-            thoughts, risk_analysis = self.generate_risk_analysis(news_data, feedback_context)
+            if evaluation is None and iteration == 1:
+                evaluation, feedback = self._precheck(risk_analysis, news_data)
             
-            # Record attempt
-            attempt_record = {
-                "iteration": iteration,
-                "thoughts": thoughts,
-                "risk_analysis": risk_analysis,
-                "summary": f"Primary: {risk_analysis.get('primary_risk_category', 'N/A')}, "
-                          f"Secondary: {risk_analysis.get('secondary_risk_categories', [])}, "
-                          f"Severity: {risk_analysis.get('severity_level', 'N/A')}, "
-                          f"Confidence: {risk_analysis.get('confidence_score', 'N/A')}%"
-            }
+            # Evaluate the analysis independently unless the self-evaluation can be trusted
+            if evaluation not in TRUSTED_SELF_EVALUATIONS:
+                if evaluated is None:
+                    evaluation, feedback = self.evaluate_risk_analysis(
+                        risk_analysis, news_data, task_description
+                    )
+                else:
+                    evaluation, feedback = self.evaluate_risk_analysis_diff(
+                        risk_analysis, news_data, task_description, evaluated
+                    )
+                evaluated = (risk_analysis, evaluation, feedback)
             
-            # Evaluate the analysis
-            evaluation, feedback = self.evaluate_risk_analysis(
-                risk_analysis, news_data, task_description
-            )
-            
-            attempt_record["evaluation"] = evaluation
-            attempt_record["feedback"] = feedback
-            iteration_history.append(attempt_record)
-            
-            # Check if we're done
-            if evaluation == "PASS":
-                print(f"✅ Risk analysis passed evaluation on iteration {iteration}")
-                return risk_analysis, iteration_history
-            
-            elif evaluation == "NEEDS_IMPROVEMENT" and iteration == self.max_iterations:
-                # Accept NEEDS_IMPROVEMENT on the final iteration to avoid endless loops
-                print(f"⚠️ Risk analysis has minor issues but is acceptable on final iteration {iteration}")
+            if self._record_iteration(iteration_history, iteration, thoughts, risk_analysis, evaluation, feedback,
+                                      previous_feedback):
                 return risk_analysis, iteration_history
             
-            elif evaluation == "FAIL" and iteration == self.max_iterations:
-                # This is where we differ from having fallback logic
-                # We raise an exception and let Huey handle retries
-                error_msg = f"Risk analysis failed evaluation after {self.max_iterations} iterations. Final feedback: {feedback}"
-                print(f"❌ {error_msg}")
-                raise Exception(error_msg)
-            
             # Prepare feedback for next iteration
             previous_feedback.append(feedback)
         
         # If we reach here, the last iteration didn't pass
         error_msg = f"Optimization incomplete after {self.max_iterations} iterations"
-        print(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
+        raise Exception(error_msg)
+    
+    async def aoptimize_risk_analysis(self, news_data: Dict, task_description: str) -> Tuple[Dict, List[Dict]]:
+        """
+        Async optimize_risk_analysis; same loop, awaiting the LLM calls.
+        
+        With speculative=True, the next generation is started concurrently with
+        the evaluator instead of after it. It is cancelled if the evaluation
+        PASSes; otherwise its output becomes the next candidate, saving one
+        generator round-trip of latency. The speculative attempt cannot see the
+        feedback it is racing, so it only gets what earlier attempts produced;
+        every candidate is still evaluated before it can be accepted.
+        
+        With best_of > 1 and a single allowed attempt, that attempt is the best
+        of several concurrently generated candidates (see _agenerate_best_of).
+        """
+        logger.info("🔄 Starting Evaluator-Optimizer workflow for news: %s", news_data['newsId'])
+        
+        iteration_history = []
+        previous_feedback = []
+        self.num_consecutive_nonimproving = 0
+        self._requests = []
+        evaluated = None
+        speculative_generation = None
+        
+        try:
+            for iteration in range(1, self.max_iterations + 1):
+                logger.debug("--- ITERATION %d (%s) ---", iteration, news_data['newsId'])
+                
+                candidate = None
+                if speculative_generation is not None:
+                    try:
+                        candidate = await speculative_generation
+                    except Exception as e:
+                        logger.warning("⚠️ Speculative generation failed, regenerating: %s", e)
+                    speculative_generation = None
+                    # A repeat of the attempt that just FAILed can't improve on it
+                    if candidate is not None and evaluated is not None and candidate[1] == evaluated[0]:
+                        logger.info("🔁 Speculative attempt repeated the previous analysis, regenerating")
+                        candidate = None
+                
+                # The best-of-N selector's verdict comes from the evaluator itself
+                selected = False
+                if candidate is None and self.best_of > 1 and self.max_iterations == 1:
+                    candidate, selected = await self._agenerate_best_of(news_data, task_description)
+                
+                if candidate is None:
+                    feedback_context = self._build_feedback_context(previous_feedback)
+                    candidate = await self._agenerate_candidate(news_data, feedback_context)
+                thoughts, risk_analysis, evaluation, feedback = candidate
+                
+                if evaluation is None and iteration == 1:
+                    evaluation, feedback = self._precheck(risk_analysis, news_data)
+                
+                if evaluation not in TRUSTED_SELF_EVALUATIONS and not selected:
+                    if evaluated is None:
+                        evaluation_call = self.aevaluate_risk_analysis(risk_analysis, news_data, task_description)
+                    else:
+                        evaluation_call = self.aevaluate_risk_analysis_diff(
+                            risk_analysis, news_data, task_description, evaluated
+                        )
+                    evaluation_task = asyncio.ensure_future(evaluation_call)
+                    if self.speculative and iteration < self.max_iterations:
+                        # Same prompt as this attempt, so sample hotter: at the same temperature
+                        # the response cache (or the model) would hand back this very attempt
+                        speculative_generation = asyncio.ensure_future(self._agenerate_candidate(
+                            news_data, self._build_feedback_context(previous_feedback),
+                            temperature=round(0.1 + SPECULATIVE_TEMPERATURE_STEP * iteration, 1)
+                        ))
+                    evaluation, feedback = await evaluation_task
+                    evaluated = (risk_analysis, evaluation, feedback)
+                
+                if self._record_iteration(iteration_history, iteration, thoughts, risk_analysis, evaluation, feedback,
+                                          previous_feedback):
+                    return risk_analysis, iteration_history
+                
+                previous_feedback.append(feedback)
+        finally:
+            # PASS on this iteration (or an error) makes any in-flight speculation moot
+            if speculative_generation is not None:
+                speculative_generation.cancel()
+        
+        error_msg = f"Optimization incomplete after {self.max_iterations} iterations"
+        logger.error("❌ %s", error_msg)
         raise Exception(error_msg)
+    
+    async def _agenerate_best_of(self, news_data: Dict, task_description: str) -> Tuple[Tuple, bool]:
+        """
+        Generate best_of candidates concurrently and pick one.
+        
+        Candidates use temperatures 0.1, 0.3, ... so they differ (and don't share a
+        response cache entry). A candidate whose self-evaluation is trusted is taken
+        as is; otherwise one evaluator call chooses and grades the best.
+        
+        Returns:
+            Tuple of (candidate, selected): selected is True when the candidate's
+            verdict came from the evaluator; (None, False) if every generation failed
+        """
+        temperatures = [round(0.1 + 0.2 * i, 1) for i in range(self.best_of)]
+        results = await asyncio.gather(
+            *(self._agenerate_candidate(news_data, "", temperature=temperature) for temperature in temperatures),
+            return_exceptions=True
+        )
+        candidates = [result for result in results if not isinstance(result, BaseException)]
+        if len(candidates) < len(results):
+            logger.warning("⚠️ %d of %d best-of candidates failed", len(results) - len(candidates), len(results))
+        
+        for candidate in candidates:
+            if candidate[2] in TRUSTED_SELF_EVALUATIONS:
+                return candidate, False
+        if len(candidates) < 2:
+            return (candidates[0] if candidates else None), False
+        
+        choice, evaluation, feedback = await self.aselect_risk_analysis(
+            [candidate[1] for candidate in candidates], news_data, task_description
+        )
+        logger.info("🏅 Evaluator chose candidate %d of %d: %s", choice + 1, len(candidates), evaluation)
+        thoughts, risk_analysis, _, _ = candidates[choice]
+        return (thoughts, risk_analysis, evaluation, feedback), True
+    
+    def _precheck(self, risk_analysis: Dict, news_data: Dict) -> Tuple[str, str]:
+        """PASS if the heuristic pre-check lets this analysis skip the evaluator, else (None, None)"""
+        if not self.precheck:
+            return None, None
+        reason = _cheap_quality_check(risk_analysis, news_data)
+        if reason is not None:
+            logger.info("🔍 Pre-check flagged %s, running evaluator", reason)
+            return None, None
+        logger.info("🔍 Pre-check passed, skipping evaluator")
+        return "PASS", PRECHECK_FEEDBACK
+    
+    def _parse_initial_response(self, content: str):
+        """Parse a pre-generated response as a candidate (None if it is unusable)"""
+        try:
+            return self._parse_self_evaluation(content)
+        except Exception as e:
+            logger.warning("⚠️ Pre-generated response unusable, regenerating: %s", e)
+            return None
+    
+    def _build_feedback_context(self, previous_feedback: List[str]) -> str:
+        """Feedback from previous attempts to include in the next generator prompt"""
+        if not previous_feedback:
+            return ""
+        return "\n".join([
+            "\nPrevious evaluation feedback to address:",
+            *(f"Attempt {i} feedback: {prev}" for i, prev in enumerate(previous_feedback, 1)),
+            "\nPlease address the above feedback and improve your analysis.\n"
+        ])
+    
+    def _feedback_stalled(self, evaluation: str, feedback: str, previous_feedback: List[str]) -> bool:
+        """Track FAILs that repeat the previous feedback; True once patience is exhausted"""
+        if (evaluation == "FAIL" and previous_feedback and
+                difflib.SequenceMatcher(None, feedback, previous_feedback[-1]).ratio() > FEEDBACK_SIMILARITY_THRESHOLD):
+            self.num_consecutive_nonimproving += 1
+        else:
+            self.num_consecutive_nonimproving = 0
+        return self.num_consecutive_nonimproving >= MAX_NONIMPROVING_ITERATIONS
+    
+    def _record_iteration(self, iteration_history: List[Dict], iteration: int, thoughts: str,
+                          risk_analysis: Dict, evaluation: str, feedback: str,
+                          previous_feedback: List[str] = ()) -> bool:
+        """
+        Record an attempt and decide whether the loop is finished.
+        
+        Returns:
+            True if risk_analysis should be returned, False to iterate again
+            
+        Raises:
+            Exception: If the final iteration FAILs, or FAIL feedback stops changing
+                (to be handled by Huey retries)
+        """
+        record = {"iteration": iteration, "evaluation": evaluation}
+        if DEBUG_HISTORY:
+            record.update({
+                "thoughts": thoughts,
+                "risk_analysis": risk_analysis,
+                "summary": f"Primary: {risk_analysis.get('primary_risk_category', 'N/A')}, "
+                          f"Secondary: {risk_analysis.get('secondary_risk_categories', [])}, "
+                          f"Severity: {risk_analysis.get('severity_level', 'N/A')}, "
+                          f"Confidence: {risk_analysis.get('confidence_score', 'N/A')}%",
+                "feedback": feedback
+            })
+        iteration_history.append(record)
+        
+        stalled = self._feedback_stalled(evaluation, feedback, previous_feedback)
+        
+        # Check if we're done
+        if evaluation == "PASS":
+            logger.info("✅ Risk analysis passed evaluation on iteration %d", iteration)
+            return True
+        
+        elif evaluation == "NEEDS_IMPROVEMENT" and iteration == self.max_iterations:
+            # Accept NEEDS_IMPROVEMENT on the final iteration to avoid endless loops
+            logger.warning("⚠️ Risk analysis has minor issues but is acceptable on final iteration %d", iteration)
+            return True
+        
+        elif evaluation == "FAIL" and (iteration == self.max_iterations or stalled):
+            # This is where we differ from having fallback logic
+            # We raise an exception and let Huey handle retries
+            error_msg = f"Risk analysis failed evaluation after {iteration} iterations"
+            if stalled and iteration < self.max_iterations:
+                error_msg += " (feedback unchanged, stopping early)"
+            error_msg += f". Final feedback: {feedback}"
+            logger.error("❌ %s", error_msg)
+            # Make the Huey retry generate and evaluate afresh instead of replaying this
+            # run's cached answers and verdicts
+            for messages, request in self._requests:
+                discard_cached_response(messages, **request)
+            self._requests = []
+            raise Exception(error_msg)
+        
+        logger.info("🔁 Iteration %d evaluated %s, regenerating with feedback", iteration, evaluation)
+        return False
 
 
-def process_news_with_evaluator_optimizer(news_data: Dict, max_iterations: int = 3) -> Dict:
+def process_news_with_evaluator_optimizer(news_data: Dict, max_iterations: int = 3,
+                                         initial_response: str = None) -> Dict:
     """
     Process news article using Evaluator-Optimizer pattern.
     Clean implementation following the Anthropic cookbook - no fallback logic.
@@ -365,6 +1381,7 @@ def process_news_with_evaluator_optimizer(news_data: Dict, max_iterations: int =
     Args:
         news_data: News article data
         max_iterations: Maximum optimization iterations
+        initial_response: Generator output from the Batch API (skips the first generation)
         
     Returns:
         dict: Risk analysis results with optimization metadata
@@ -372,50 +1389,228 @@ def process_news_with_evaluator_optimizer(news_data: Dict, max_iterations: int =
     Raises:
         Exception: If optimization fails (to be handled by Huey retries)
     """
+    optimizer, task_description = _prepare_optimization(news_data, max_iterations)
+    
+    cached = _get_cached_analysis(news_data)
+    if cached is not None:
+        return cached
+    
+    # Run the optimization process - let exceptions bubble up to Huey
+    optimized_analysis, history = optimizer.optimize_risk_analysis(
+        news_data, task_description, initial_response=initial_response
+    )
+    
+    return _cache_analysis(news_data, _add_optimization_meta(optimized_analysis, history))
+
+
+async def aprocess_news_with_evaluator_optimizer(news_data: Dict, max_iterations: int = 3,
+                                                 speculative: bool = SPECULATIVE_GENERATION) -> Dict:
+    """Async process_news_with_evaluator_optimizer (same checks, awaiting the LLM calls)"""
+    optimizer, task_description = _prepare_optimization(news_data, max_iterations)
+    cached = _get_cached_analysis(news_data)
+    if cached is not None:
+        return cached
+    optimizer.speculative = speculative
+    optimized_analysis, history = await optimizer.aoptimize_risk_analysis(news_data, task_description)
+    return _cache_analysis(news_data, _add_optimization_meta(optimized_analysis, history))
+
+
+async def aprocess_news_batch(news_list: List[Dict], max_iterations: int = 3,
+                              max_concurrency: int = None) -> List:
+    """
+    Run the Evaluator-Optimizer workflow for many articles concurrently.
+    
+    LLM round-trips dominate per-article latency, so articles are optimized in
+    parallel (bounded by a semaphore) while util.py's shared rate limiter keeps
+    the combined request/token rate under the provider limits.
+    
+    Args:
+        news_list: News article data dicts
+        max_iterations: Maximum optimization iterations per article
+        max_concurrency: Articles in flight at once (defaults to LLM_MAX_CONCURRENCY)
+        
+    The async LLM client is scoped to the running event loop and closed when the
+    batch finishes, so each asyncio.run() caller gets connections of its own.
+    
+    Returns:
+        list: One entry per input article, in order - the risk analysis dict,
+              or the Exception raised for that article
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or MAX_CONCURRENCY)
+    
+    async def process_one(news_data):
+        async with semaphore:
+            return await aprocess_news_with_evaluator_optimizer(news_data, max_iterations)
+    
+    try:
+        results = await asyncio.gather(
+            *(process_one(news_data) for news_data in news_list),
+            return_exceptions=True
+        )
+    finally:
+        await aclose_async_client()
+    
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    logger.info("📦 Batch complete: %d analyzed, %d failed", len(results) - failed, failed)
+    return results
+
+
+# Batch API statuses of a job that can still produce output; every other status is final
+BATCH_RUNNING_STATUSES = ('validating', 'in_progress', 'finalizing', 'cancelling')
+
+
+def submit_generation_batch(news_list: List[Dict]) -> str:
+    """
+    Submit first-pass generations for many articles as one OpenAI Batch API job.
+    
+    Batch requests cost half as much as synchronous calls but complete
+    asynchronously (24h window), so this is only for backlog processing.
+    Each request's custom_id is the article's newsId.
+    
+    Args:
+        news_list: News article data dicts
+        
+    Returns:
+        str: Batch id (poll with collect_generation_batch)
+    """
+    optimizer = RiskAnalysisEvaluatorOptimizer()
+    if optimizer.self_evaluate:
+        build_messages, response_format = optimizer._build_self_evaluation_messages, SELF_EVALUATED_RESPONSE_FORMAT
+    else:
+        build_messages, response_format = optimizer._build_generation_messages, RISK_ANALYSIS_RESPONSE_FORMAT
+    model = optimizer.generator_model or get_model_name()
+    provider = os.getenv('LLM_PROVIDER', 'openai').lower()
+    endpoint = "/chat/completions" if provider == 'azure' else "/v1/chat/completions"
+    
+    lines = []
+    for news_data in news_list:
+        lines.append(json.dumps({
+            "custom_id": news_data['newsId'],
+            "method": "POST",
+            "url": endpoint,
+            "body": {
+                "model": model,
+                "messages": build_messages(news_data, ""),
+                "temperature": 0.1,
+                **({"response_format": response_format} if optimizer.structured else {})
+            }
+        }))
+    
+    batch_file = client.files.create(
+        file=("risk_generation_batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=endpoint,
+        completion_window="24h"
+    )
+    
+    logger.info("📦 Submitted generation batch %s with %d articles", batch.id, len(lines))
+    return batch.id
+
+
+def collect_generation_batch(batch_id: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Check a Batch API job and download its responses once it has finished.
+    
+    Args:
+        batch_id: Id returned by submit_generation_batch
+        
+    Returns:
+        Tuple of (batch status, {newsId: generator response}); the dict is
+        empty while the batch is running (BATCH_RUNNING_STATUSES) and omits
+        requests that errored. Expired and cancelled batches return the
+        requests they finished before stopping.
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status in BATCH_RUNNING_STATUSES or not batch.output_file_id:
+        return batch.status, {}
+    
+    responses = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            logger.warning("⚠️ Batch request %s failed: %s", result.get('custom_id'), result.get('error'))
+            continue
+        responses[result["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    
+    return batch.status, responses
+
+
+def generate_group_responses(news_list: List[Dict]) -> Dict[str, str]:
+    """
+    First-pass generations for several articles from a single generator call.
+    
+    The instructions, output schema and scoring context make up most of the
+    generator prompt, so packing K articles into one prompt sends them once
+    instead of K times and needs one round-trip instead of K.
+    
+    Args:
+        news_list: News article data dicts (a handful; each adds its output to the response)
+        
+    Returns:
+        {newsId: generator response} in the single-article format, ready to be
+        passed as initial_response; articles the model skipped are omitted
+    """
+    optimizer = RiskAnalysisEvaluatorOptimizer()
+    if optimizer.structured:
+        response_format = SELF_EVALUATED_GROUP_RESPONSE_FORMAT if optimizer.self_evaluate else GROUP_RESPONSE_FORMAT
+    else:
+        response_format = None
+    
+    messages = optimizer._build_group_generation_messages(news_list)
+    content = llm_call(messages, model=optimizer.generator_model, temperature=0.1, response_format=response_format)
+    responses = optimizer._parse_or_discard(
+        messages, content, lambda text: optimizer._split_group_response(text, news_list),
+        model=optimizer.generator_model, response_format=response_format
+    )
+    
+    logger.info("🧺 Generated %d of %d articles in one call", len(responses), len(news_list))
+    return responses
+
+
+def _prepare_optimization(news_data: Dict, max_iterations: int) -> Tuple[RiskAnalysisEvaluatorOptimizer, str]:
+    """
+    Check the article is worth analyzing and set up the optimizer.
+    
+    Raises:
+        Exception: If the story is too short or the headline was already analyzed
+    """
     # Check if story length is sufficient for processing
     story = news_data.get('story', '')
     if len(story) <= 450:
         raise Exception(f"News story too short for analysis: {len(story)} characters (minimum 450 required). Skipping news ID: {news_data.get('newsId', 'UNKNOWN')}")
     
     # Check if headline already exists in news_articles table
-    from news_risk_analyzer import get_risk_db_connection
-    
     headline = news_data.get('headline', '')
     if headline:
         try:
-            with get_risk_db_connection() as risk_conn:
-                existing_news = risk_conn.execute("""
-                    SELECT id FROM news_articles 
-                    WHERE headline = ?
-                """, [headline]).fetchone()
-                
-                if existing_news:
-                    raise Exception(f"Headline already exists in database (ID: {existing_news[0]}). Skipping news ID: {news_data.get('newsId', 'UNKNOWN')}")
+            existing_news = get_conn().execute("""
+                SELECT id FROM news_articles 
+                WHERE headline = ?
+            """, [headline]).fetchone()
+            
+            if existing_news:
+                raise Exception(f"Headline already exists in database (ID: {existing_news[0]}). Skipping news ID: {news_data.get('newsId', 'UNKNOWN')}")
         except Exception as e:
             # If it's our "already exists" exception, re-raise it
             if "already exists in database" in str(e):
                 raise e
             # For other database errors, log and continue (don't skip processing)
-            print(f"⚠️ Warning: Database check failed, continuing with processing: {e}")
+            logger.warning("⚠️ Warning: Database check failed, continuing with processing: %s", e)
     
     # Initialize the optimizer
     optimizer = RiskAnalysisEvaluatorOptimizer(max_iterations=max_iterations)
     
-    # Define the analysis task
-    task_description = """
-    Analyze banking/financial news for comprehensive risk assessment including:
-    - Accurate risk categorization and severity assessment and sentiment analysis with justification
-    - Realistic financial exposure estimates
-    - Proper confidence scoring based on information quality  
-    - Correct identification of market-moving events
-    - Appropriate action requirements for risk management
-    - Historical impact analysis
-    """
-    
-    # Run the optimization process - let exceptions bubble up to Huey
-    optimized_analysis, history = optimizer.optimize_risk_analysis(news_data, task_description)
-    
-    # Add optimization metadata
+    return optimizer, _TASK_DESCRIPTION
+
+
+def _add_optimization_meta(optimized_analysis: Dict, history: List[Dict]) -> Dict:
+    """Attach optimization metadata (popped and logged by process_news_article)"""
     optimized_analysis['_optimization_meta'] = {
         'iterations_used': len(history),
         'final_evaluation': history[-1]['evaluation'] if history else 'UNKNOWN',
@@ -426,6 +1621,35 @@ def process_news_with_evaluator_optimizer(news_data: Dict, max_iterations: int =
     return optimized_analysis
 
 
+def _analysis_cache_key(news_data: Dict) -> str:
+    """Exact-match key: the headline plus the start of the story"""
+    text = news_data.get('headline', '') + news_data.get('story', '')[:2000]
+    return "analysis:" + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _get_cached_analysis(news_data: Dict) -> Optional[Dict]:
+    """Analysis of an identical article from the analysis cache (None on a miss)"""
+    if _analysis_cache is None:
+        return None
+    cached = _analysis_cache.get(_analysis_cache_key(news_data))
+    if cached is None:
+        return None
+    
+    analysis = _json_loads(cached)
+    analysis.setdefault('_optimization_meta', {}).update(
+        cache_hit=True, optimization_timestamp=datetime.now().isoformat()
+    )
+    logger.info("♻️ Reusing cached analysis for news %s", news_data.get('newsId', 'UNKNOWN'))
+    return analysis
+
+
+def _cache_analysis(news_data: Dict, analysis: Dict) -> Dict:
+    """Store a finished analysis in the analysis cache and return it"""
+    if _analysis_cache is not None:
+        _analysis_cache.set(_analysis_cache_key(news_data), _compact_json(analysis))
+    return analysis
+
+
 # Example usage and testing
 if __name__ == "__main__":
     # Test data
@@ -4,6 +4,20 @@ Financial Risk Theme Classification System
 Focused on negative financial news and banking/market risks only.
 """
 
+import os
+import json
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# get_theme_statistics: articles per classification call and calls in flight
+THEME_BATCH_SIZE = max(1, int(os.getenv('THEME_BATCH_SIZE', '25')))
+THEME_BATCH_WORKERS = max(1, int(os.getenv('THEME_BATCH_WORKERS', '4')))
+# Highest-confidence headlines kept per theme (counts still cover every article)
+THEME_TOP_ARTICLES = 10
+
 # Financial Risk Theme Taxonomy (Comprehensive 12-Theme System)
 FINANCIAL_RISK_THEMES = {
     "credit_crisis": {
@@ -288,6 +302,127 @@ FINANCIAL_RISK_THEMES = {
     }
 }
 
+# Risk category -> theme used when no theme keyword matches
+RISK_TO_THEME_MAP = {
+    "credit_risk": "credit_crisis",
+    "market_risk": "market_volatility", 
+    "currency_risk": "currency_crisis",
+    "exchange_risk": "currency_crisis",
+    "fx_risk": "currency_crisis",
+    "operational_risk": "operational_disruption",
+    "cybersecurity_risk": "cyber_security_breach",
+    "regulatory_risk": "regulatory_crackdown",
+    "liquidity_risk": "liquidity_shortage",
+    "systemic_risk": "systemic_banking_crisis",
+    "interest_rate_risk": "interest_rate_shock",
+    "geopolitical_risk": "geopolitical_crisis",
+    "real_estate_risk": "real_estate_crisis",
+    "climate_risk": "esg_climate_risk",
+    "esg_risk": "esg_climate_risk",
+    "inflation_risk": "inflation_crisis",
+    "sovereign_risk": "sovereign_debt_crisis",
+    "supply_chain_risk": "supply_chain_crisis"
+}
+
+# Every (theme_id, keyword, lowercased keyword) in taxonomy order, flattened once so
+# matching works on integer positions instead of walking the nested theme dicts
+_THEME_KEYWORDS = tuple(
+    (theme_id, keyword, keyword.lower())
+    for theme_id, theme_info in FINANCIAL_RISK_THEMES.items()
+    for keyword in theme_info["keywords"]
+)
+
+def _build_keyword_automaton():
+    """
+    Aho-Corasick automaton over every theme keyword (None without pyahocorasick).
+    
+    Each lowercased keyword maps to its positions in _THEME_KEYWORDS, so one
+    pass over the text finds the hits for all themes at once.
+    """
+    if ahocorasick is None:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for position, (_, _, needle) in enumerate(_THEME_KEYWORDS):
+        automaton.add_word(needle, automaton.get(needle, ()) + (position,))
+    automaton.make_automaton()
+    return automaton
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+def _matched_theme_keywords(text):
+    """
+    Keywords found in lowercased text, grouped by theme.
+    
+    Returns:
+        dict: theme_id -> matched keywords (themes and keywords in taxonomy order;
+        each keyword counted once)
+    """
+    if _KEYWORD_AUTOMATON is None:
+        hits = [entry for entry in _THEME_KEYWORDS if entry[2] in text]
+    else:
+        found = set()
+        for _, positions in _KEYWORD_AUTOMATON.iter(text):
+            found.update(positions)
+        hits = [_THEME_KEYWORDS[position] for position in sorted(found)]
+    
+    matches = {}
+    for theme_id, keyword, _ in hits:
+        matches.setdefault(theme_id, []).append(keyword)
+    return matches
+
+def _theme_options():
+    """Theme list shown to the LLM, one "- id: name - description" line per theme"""
+    return "\n".join(
+        f"- {theme_id}: {theme_info['display_name']} - {theme_info['description']}"
+        for theme_id, theme_info in FINANCIAL_RISK_THEMES.items()
+    )
+
+_JSON_DECODER = json.JSONDecoder()
+
+def _extract_json(response, expected_type):
+    """
+    First JSON object/array of the expected type embedded in an LLM response.
+    
+    Decodes from each candidate opening bracket with raw_decode, which stops at
+    the matching close, so surrounding prose, code fences or further JSON
+    fragments are ignored.
+    
+    Raises:
+        ValueError: If the response contains no such JSON value
+    """
+    opener = "{" if expected_type is dict else "["
+    start = response.find(opener)
+    while start != -1:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(response, start)
+            if isinstance(value, expected_type):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = response.find(opener, start + 1)
+    raise ValueError("Invalid JSON response from LLM")
+
+def _llm_theme_result(llm_result):
+    """Validate one parsed LLM classification and build the theme result dict"""
+    theme_id = llm_result.get("primary_theme", "other_financial_risks")
+    confidence = llm_result.get("confidence", 70)
+    reasoning = llm_result.get("reasoning", "LLM classification")
+    
+    # Validate theme exists
+    if theme_id not in FINANCIAL_RISK_THEMES:
+        theme_id = "other_financial_risks"
+        confidence = 30
+        reasoning = "Invalid theme returned, using fallback"
+    
+    return {
+        "primary_theme": theme_id,
+        "theme_display_name": FINANCIAL_RISK_THEMES[theme_id]["display_name"],
+        "confidence": min(max(confidence, 1), 100),  # Ensure 1-100 range
+        "reasoning": reasoning,
+        "method": "llm_classification"
+    }
+
 def classify_news_theme(headline, content, risk_categories=None):
     """
     Classify news into financial risk themes using LLM-based analysis.
@@ -304,16 +439,11 @@ def classify_news_theme(headline, content, risk_categories=None):
         # Import LLM utility
         from util import llm_call
         
-        # Build theme options for LLM
-        theme_options = []
-        for theme_id, theme_info in FINANCIAL_RISK_THEMES.items():
-            theme_options.append(f"- {theme_id}: {theme_info['display_name']} - {theme_info['description']}")
-        
         # Create LLM prompt for theme classification
         prompt = f"""You are a financial risk analyst tasked with classifying news into specific financial risk themes.
 
 AVAILABLE THEMES:
-{chr(10).join(theme_options)}
+{_theme_options()}
 
 NEWS TO CLASSIFY:
 Headline: {headline}
@@ -341,101 +471,101 @@ Choose the theme that BEST matches the primary financial risk in this news. If n
         )
         
         # Parse LLM response
-        import json
-        import re
-        
-        # Extract JSON from response
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if json_match:
-            llm_result = json.loads(json_match.group())
-            
-            theme_id = llm_result.get("primary_theme", "other_financial_risks")
-            confidence = llm_result.get("confidence", 70)
-            reasoning = llm_result.get("reasoning", "LLM classification")
-            
-            # Validate theme exists
-            if theme_id not in FINANCIAL_RISK_THEMES:
-                theme_id = "other_financial_risks"
-                confidence = 30
-                reasoning = "Invalid theme returned, using fallback"
-            
-            return {
-                "primary_theme": theme_id,
-                "theme_display_name": FINANCIAL_RISK_THEMES[theme_id]["display_name"],
-                "confidence": min(max(confidence, 1), 100),  # Ensure 1-100 range
-                "reasoning": reasoning,
-                "method": "llm_classification"
-            }
-        else:
-            raise ValueError("Invalid JSON response from LLM")
+        return _llm_theme_result(_extract_json(response, dict))
             
     except Exception as e:
         print(f"⚠️ LLM theme classification failed: {e}")
         # Fallback to keyword matching
         return classify_news_theme_fallback(headline, content, risk_categories)
 
-def classify_news_theme_fallback(headline, content, risk_categories=None):
+def classify_news_themes_batch(items):
     """
-    Fallback theme classification using keyword matching when LLM fails.
+    Classify several articles into financial risk themes with one LLM call.
+    
+    Args:
+        items (list): (item_id, headline, content, risk_categories) tuples
+        
+    Returns:
+        dict: item_id -> theme classification result; articles missing from
+        the LLM response fall back to keyword matching
     """
-    text = f"{headline} {content}".lower()
+    results = {}
     
-    # Score each theme based on keyword matches
-    theme_scores = {}
-    for theme_id, theme_info in FINANCIAL_RISK_THEMES.items():
-        score = 0
-        matched_keywords = []
+    try:
+        from util import llm_call
         
-        for keyword in theme_info["keywords"]:
-            if keyword.lower() in text:
-                score += 1
-                matched_keywords.append(keyword)
+        articles = "\n\n".join(
+            f"[{number}]\nHeadline: {headline}\nContent: {(content or '')[:1000]}..."
+            for number, (_, headline, content, _) in enumerate(items, 1)
+        )
         
-        if score > 0:
-            theme_scores[theme_id] = {
-                "score": score,
-                "matched_keywords": matched_keywords,
-                "display_name": theme_info["display_name"],
-                "description": theme_info["description"]
-            }
+        prompt = f"""You are a financial risk analyst tasked with classifying news into specific financial risk themes.
+
+AVAILABLE THEMES:
+{_theme_options()}
+
+NEWS TO CLASSIFY ({len(items)} articles):
+{articles}
+
+TASK:
+Classify EACH article above into ONE of the available themes. Consider:
+1. The primary financial risk being discussed
+2. The main impact on banking/financial sector
+3. The core nature of the risk event
+
+Return your response as a JSON array with one object per article, in this exact format:
+[
+    {{"id": 1, "primary_theme": "theme_id_here", "confidence": 85, "reasoning": "Brief explanation"}}
+]
+
+Use the article number as "id". If no theme fits an article perfectly, choose "other_financial_risks"."""
+
+        response = llm_call(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1
+        )
+        
+        for llm_result in _extract_json(response, list):
+            try:
+                index = int(llm_result.get("id")) - 1
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if 0 <= index < len(items):
+                results[items[index][0]] = _llm_theme_result(llm_result)
+                
+    except Exception as e:
+        print(f"⚠️ LLM batch theme classification failed: {e}")
     
-    # Sort by score and return top match
-    if theme_scores:
-        best_theme = max(theme_scores.items(), key=lambda x: x[1]["score"])
+    for item_id, headline, content, risk_categories in items:
+        if item_id not in results:
+            results[item_id] = classify_news_theme_fallback(headline, content, risk_categories)
+    
+    return results
+
+def classify_news_theme_fallback(headline, content, risk_categories=None):
+    """
+    Fallback theme classification using keyword matching when LLM fails.
+    """
+    text = f"{headline} {content}".lower()
+    
+    # Score each theme by its number of matched keywords and return the top match
+    # (first theme in taxonomy order wins a tie)
+    theme_matches = _matched_theme_keywords(text)
+    if theme_matches:
+        best_theme, matched_keywords = max(theme_matches.items(), key=lambda item: len(item[1]))
         return {
-            "primary_theme": best_theme[0],
-            "theme_display_name": best_theme[1]["display_name"],
-            "confidence": min(best_theme[1]["score"] * 20, 100),  # Max 100%
-            "matched_keywords": best_theme[1]["matched_keywords"],
+            "primary_theme": best_theme,
+            "theme_display_name": FINANCIAL_RISK_THEMES[best_theme]["display_name"],
+            "confidence": min(len(matched_keywords) * 20, 100),  # Max 100%
+            "matched_keywords": matched_keywords,
             "method": "keyword_fallback"
         }
     
     # Fallback to risk category mapping if no keywords match
     if risk_categories:
-        risk_to_theme_map = {
-            "credit_risk": "credit_crisis",
-            "market_risk": "market_volatility", 
-            "currency_risk": "currency_crisis",
-            "exchange_risk": "currency_crisis",
-            "fx_risk": "currency_crisis",
-            "operational_risk": "operational_disruption",
-            "cybersecurity_risk": "cyber_security_breach",
-            "regulatory_risk": "regulatory_crackdown",
-            "liquidity_risk": "liquidity_shortage",
-            "systemic_risk": "systemic_banking_crisis",
-            "interest_rate_risk": "interest_rate_shock",
-            "geopolitical_risk": "geopolitical_crisis",
-            "real_estate_risk": "real_estate_crisis",
-            "climate_risk": "esg_climate_risk",
-            "esg_risk": "esg_climate_risk",
-            "inflation_risk": "inflation_crisis",
-            "sovereign_risk": "sovereign_debt_crisis",
-            "supply_chain_risk": "supply_chain_crisis"
-        }
-        
         for risk in risk_categories:
-            if risk in risk_to_theme_map:
-                theme_id = risk_to_theme_map[risk]
+            theme_id = RISK_TO_THEME_MAP.get(risk)
+            if theme_id:
                 return {
                     "primary_theme": theme_id,
                     "theme_display_name": FINANCIAL_RISK_THEMES[theme_id]["display_name"],
@@ -452,41 +582,114 @@ def classify_news_theme_fallback(headline, content, risk_categories=None):
         "method": "default_fallback"
     }
 
+def _theme_cache_key(headline, content):
+    """Digest of the text classify_news_theme actually sends to the LLM"""
+    import hashlib
+    
+    return hashlib.blake2b(f"{headline}\n{(content or '')[:1000]}".encode("utf-8"), digest_size=16).digest()
+
 def get_theme_statistics(db_path="risk_dashboard.db"):
-    """Get theme distribution from database."""
-    import sqlite3
-    import json
+    """
+    Get theme distribution from database.
+    
+    Articles that were themed during processing keep their stored theme; the
+    rest are classified once per distinct headline/content, THEME_BATCH_SIZE
+    articles per LLM call with up to THEME_BATCH_WORKERS calls in flight.
+    
+    Rows are streamed from the cursor and each theme keeps only its
+    THEME_TOP_ARTICLES highest-confidence headlines. Unthemed articles are
+    classified in chunks of THEME_BATCH_SIZE x THEME_BATCH_WORKERS as they
+    arrive, so article content is held for one chunk at a time; only a small
+    digest -> theme entry per distinct unthemed article outlives its chunk.
+    """
+    import heapq
+    from itertools import count
+    from concurrent.futures import ThreadPoolExecutor
+    from db import get_conn
     
     theme_stats = {}
+    pending = {}
+    deferred = []
+    classified = {}
+    order = count()
+    
+    def add_article(headline, theme_result):
+        theme = theme_result["primary_theme"]
+        
+        if theme not in theme_stats:
+            theme_stats[theme] = {
+                "count": 0,
+                "display_name": theme_result["theme_display_name"],
+                "articles": []
+            }
+        
+        theme_stats[theme]["count"] += 1
+        # Min-heap of (confidence, arrival, article): the root is the weakest kept article
+        entry = (theme_result["confidence"] or 0, next(order), {
+            "headline": headline[:100],
+            "confidence": theme_result["confidence"]
+        })
+        top = theme_stats[theme]["articles"]
+        if len(top) < THEME_TOP_ARTICLES:
+            heapq.heappush(top, entry)
+        else:
+            heapq.heappushpop(top, entry)
+    
+    def classify_pending(executor):
+        items = list(pending.values())
+        batches = [items[i:i + THEME_BATCH_SIZE] for i in range(0, len(items), THEME_BATCH_SIZE)]
+        for results in executor.map(classify_news_themes_batch, batches):
+            classified.update(results)
+        for key, headline in deferred:
+            add_article(headline, classified[key])
+        pending.clear()
+        deferred.clear()
     
     try:
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.execute("""
-                SELECT headline, content, risk_categories, primary_risk_category
-                FROM news_articles 
-                WHERE sentiment_score < 0  -- Only negative news
-            """)
-            
-            for row in cursor.fetchall():
-                headline, content, risk_cats_json, primary_risk = row
-                risk_categories = json.loads(risk_cats_json) if risk_cats_json else []
+        # content is only needed to classify rows without a known theme; skipping it for the
+        # rest keeps SQLite from reading the (large) column's overflow pages at all.
+        # sentiment_score < 0 is served by the ix_news_sent_sign index (db.SCHEMA_INDEXES)
+        theme_ids = list(FINANCIAL_RISK_THEMES)
+        cursor = get_conn(db_path).execute(f"""
+            SELECT headline,
+                   CASE WHEN primary_theme IN ({','.join('?' * len(theme_ids))}) THEN NULL ELSE content END,
+                   risk_categories, primary_risk_category,
+                   primary_theme, theme_display_name, theme_confidence
+            FROM news_articles 
+            WHERE sentiment_score < 0  -- Only negative news
+              AND status != 'Archived'
+        """, theme_ids)
+        
+        # Worker threads only start once there is something to classify
+        with ThreadPoolExecutor(max_workers=THEME_BATCH_WORKERS) as executor:
+            for row in cursor:
+                headline, content, risk_cats_json, primary_risk, stored_theme, stored_name, stored_confidence = row
                 
-                # Classify into theme
-                theme_result = classify_news_theme(headline, content, risk_categories)
-                theme = theme_result["primary_theme"]
+                if stored_theme in FINANCIAL_RISK_THEMES:
+                    add_article(headline, {
+                        "primary_theme": stored_theme,
+                        "theme_display_name": stored_name or FINANCIAL_RISK_THEMES[stored_theme]["display_name"],
+                        "confidence": stored_confidence
+                    })
+                    continue
                 
-                if theme not in theme_stats:
-                    theme_stats[theme] = {
-                        "count": 0,
-                        "display_name": theme_result["theme_display_name"],
-                        "articles": []
-                    }
+                # Duplicates in the feed share one classification
+                key = _theme_cache_key(headline, content)
+                if key in classified:
+                    add_article(headline, classified[key])
+                    continue
+                if key not in pending:
+                    risk_categories = json.loads(risk_cats_json) if risk_cats_json else []
+                    pending[key] = (key, headline, content, risk_categories)
+                deferred.append((key, headline[:100]))
                 
-                theme_stats[theme]["count"] += 1
-                theme_stats[theme]["articles"].append({
-                    "headline": headline[:100],
-                    "confidence": theme_result["confidence"]
-                })
+                if len(pending) >= THEME_BATCH_SIZE * THEME_BATCH_WORKERS:
+                    classify_pending(executor)
+            
+            classify_pending(executor)
+        
+        for stats in theme_stats.values():
+            stats["articles"] = [article for _, _, article in sorted(stats["articles"], reverse=True)]
         
         return theme_stats
         
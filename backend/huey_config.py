@@ -25,12 +25,21 @@ def get_huey_instance():
         
         print(f"🔧 Using Redis Huey backend: {redis_host}:{redis_port}/{redis_db}")
         
-        return RedisHuey(
-            name='news_risk_analyzer',
+        # One bounded pool of keep-alive connections shared by every enqueue and
+        # worker thread in the process, instead of reconnecting under load
+        import redis
+        connection_pool = redis.ConnectionPool(
             host=redis_host,
             port=redis_port,
             db=redis_db,
             password=redis_password,
+            max_connections=int(os.getenv('HUEY_REDIS_MAX_CONNECTIONS', 64)),
+            socket_keepalive=True
+        )
+        
+        return RedisHuey(
+            name='news_risk_analyzer',
+            connection_pool=connection_pool,
             # Multiple consumer optimizations
             blocking=True,  # Use blocking pop for efficiency
             read_timeout=1  # 1 second timeout for blocking reads
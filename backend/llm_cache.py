@@ -0,0 +1,174 @@
+"""
+LLM Response Cache
+Content-addressed cache for chat completions, keyed on (model, messages, temperature).
+
+With low temperatures an identical prompt yields an (effectively) identical
+answer, so Huey retries and repeated dev runs can reuse the previous response
+instead of paying for the call again.
+
+Configuration (environment):
+    LLM_CACHE_BACKEND   memory (default), redis, or none
+    LLM_CACHE_TTL       Seconds to keep a response (default: 86400)
+    LLM_CACHE_MAX_SIZE  Entries kept by the memory backend (default: 1000)
+    REDIS_HOST / REDIS_PORT / REDIS_DB / REDIS_PASSWORD  (redis backend, as for Huey)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class CacheBackend(ABC):
+    """Storage interface used by LLMCache"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Cached value for key, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: int):
+        """Store value under key for ttl seconds"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove key if present"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache with expiry"""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis-backed cache shared by every Huey worker/consumer"""
+
+    PREFIX = 'llm_cache:'
+
+    def __init__(self):
+        import redis
+        self._redis = redis.Redis(
+            host=os.getenv('REDIS_HOST', 'localhost'),
+            port=int(os.getenv('REDIS_PORT', 6379)),
+            db=int(os.getenv('REDIS_DB', 0)),
+            password=os.getenv('REDIS_PASSWORD', None),
+            decode_responses=True
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        return self._redis.get(self.PREFIX + key)
+
+    def set(self, key: str, value: str, ttl: int):
+        self._redis.setex(self.PREFIX + key, ttl, value)
+
+    def delete(self, key: str):
+        self._redis.delete(self.PREFIX + key)
+
+
+class LLMCache:
+    """
+    Cache of LLM responses keyed by a hash of the request.
+
+    Backend errors are logged and treated as misses so a cache outage never
+    fails an LLM call.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int = 86400):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list, temperature: float, **options) -> str:
+        """
+        sha256 of the canonical JSON form of the request
+
+        Extra request options (response_format, max_tokens, ...) are part of
+        the key when set; None values are ignored.
+        """
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        request.update({name: value for name, value in options.items() if value is not None})
+        payload = json.dumps(request, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️ Warning: LLM cache read failed: {e}")
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            print(f"⚠️ Warning: LLM cache write failed: {e}")
+
+    def delete(self, key: str):
+        """Drop a response (e.g. one that turned out to be malformed) so retries call the API"""
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            print(f"⚠️ Warning: LLM cache delete failed: {e}")
+
+
+def create_llm_cache(ttl: int = None) -> Optional[LLMCache]:
+    """
+    Build the cache configured by LLM_CACHE_BACKEND (None when disabled)
+
+    Args:
+        ttl: Seconds to keep entries (defaults to LLM_CACHE_TTL)
+    """
+    backend_name = os.getenv('LLM_CACHE_BACKEND', 'memory').lower()
+    ttl = ttl or int(os.getenv('LLM_CACHE_TTL', '86400'))
+
+    if backend_name == 'none':
+        return None
+
+    if backend_name == 'redis':
+        try:
+            print("🔧 Using Redis LLM response cache")
+            return LLMCache(RedisCacheBackend(), ttl=ttl)
+        except ImportError:
+            print("⚠️ Warning: redis package not installed, falling back to in-memory LLM cache")
+
+    max_size = int(os.getenv('LLM_CACHE_MAX_SIZE', '1000'))
+    return LLMCache(MemoryCacheBackend(max_size=max_size), ttl=ttl)
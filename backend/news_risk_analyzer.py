@@ -13,12 +13,15 @@ Note: Main API runs on http://localhost:8000 (risk_dashboard_api.py)
 import sqlite3
 import json
 import os
+import time
+import asyncio
 from datetime import datetime
 from huey import crontab
 from contextlib import contextmanager
 from threading import Lock
 from dotenv import load_dotenv
 from util import llm_call, validate_risk_analysis
+from db import ensure_schema, refresh_materialized, count_rows, DASHBOARD_VIEWS, MATERIALIZED_VIEWS
 
 # Load environment variables
 load_dotenv()
@@ -61,6 +64,23 @@ class Config:
     # Evaluator-Optimizer Configuration
     MAX_OPTIMIZATION_ITERATIONS = int(os.getenv('MAX_OPTIMIZATION_ITERATIONS', '1'))
     
+    # OpenAI Batch API for the backlog (half price, up to 24h turnaround);
+    # breaking news always takes the synchronous path
+    USE_BATCH_API = os.getenv('USE_BATCH_API', 'false').lower() == 'true'
+    BATCH_API_MAX_ITEMS = int(os.getenv('BATCH_API_MAX_ITEMS', '500'))
+    
+    # Analyze each auto-processing batch in one task with concurrent async LLM calls
+    # (bounded by LLM_MAX_CONCURRENCY) instead of one task per article
+    CONCURRENT_PROCESSING = os.getenv('CONCURRENT_PROCESSING', 'false').lower() == 'true'
+    
+    # Articles per generator prompt in auto-processing: above 1, unprocessed articles are
+    # generated in groups of this size with one LLM call each (evaluation stays per article)
+    GENERATION_GROUP_SIZE = int(os.getenv('GENERATION_GROUP_SIZE', '1'))
+    
+    # Minimum seconds between the materialized dashboard table rebuilds triggered by new
+    # articles (per process); auto_refresh_materialized_views picks up the rest
+    MATERIALIZED_REFRESH_INTERVAL = int(os.getenv('MATERIALIZED_REFRESH_INTERVAL', '60'))
+    
     @classmethod
     def validate(cls):
         """Validate required configuration"""
@@ -104,8 +124,10 @@ class DatabaseConnectionPool:
                         check_same_thread=False
                     )
                     # Enable foreign keys and WAL mode for better performance
+                    # (synchronous=NORMAL is durable under WAL and skips an fsync per commit)
                     conn.execute("PRAGMA foreign_keys = ON")
                     conn.execute("PRAGMA journal_mode = WAL")
+                    conn.execute("PRAGMA synchronous = NORMAL")
                 else:
                     raise Exception(f"Connection pool exhausted (max: {self.max_connections})")
             
@@ -143,6 +165,9 @@ class DatabaseConnectionPool:
 risk_db_pool = DatabaseConnectionPool(Config.RISK_DB, Config.MAX_CONNECTIONS)
 knowledge_db_pool = DatabaseConnectionPool(Config.KNOWLEDGE_DB, Config.MAX_CONNECTIONS)
 
+# Create managed indexes / generated columns / materialized tables before any task runs
+ensure_schema(Config.RISK_DB)
+
 @contextmanager
 def get_risk_db_connection():
     """Context manager for risk database connections"""
@@ -161,6 +186,29 @@ def get_knowledge_db_connection():
     finally:
         knowledge_db_pool.return_connection(conn)
 
+_last_materialized_refresh = 0.0
+_materialized_refresh_lock = Lock()
+
+def refresh_materialized_debounced():
+    """
+    Rebuild the materialized dashboard tables unless this process already did within
+    Config.MATERIALIZED_REFRESH_INTERVAL seconds
+
+    Each rebuild re-aggregates news_articles under a write lock, so a burst of
+    articles shares one instead of paying it per article.
+
+    Returns:
+        bool: True if the tables were rebuilt
+    """
+    global _last_materialized_refresh
+    with _materialized_refresh_lock:
+        now = time.monotonic()
+        if now - _last_materialized_refresh < Config.MATERIALIZED_REFRESH_INTERVAL:
+            return False
+        _last_materialized_refresh = now
+    refresh_materialized(db_path=Config.RISK_DB)
+    return True
+
 # ==========================================
 # SETUP: Huey Configuration
 # ==========================================
@@ -181,7 +229,7 @@ from huey_config import huey
 
 
 @huey.task(retries=Config.MAX_RETRIES, retry_delay=Config.RETRY_DELAY)
-def process_news_article(news_data):
+def process_news_article(news_data, generation_response=None, risk_analysis=None):
     """
     Process news article using Evaluator-Optimizer pattern for improved risk analysis quality.
     No fallback logic - errors are handled by Huey retries as per Anthropic cookbook pattern.
@@ -193,6 +241,10 @@ def process_news_article(news_data):
             - story: Full article content
             - newsSource: Source name (Reuters, Bloomberg, etc.)
             - creationTimestamp: When news was created
+        generation_response (str): Generator output already obtained through the
+            Batch API or a grouped generation; the workflow resumes at the evaluation step
+        risk_analysis (dict): Finished Evaluator-Optimizer result (concurrent batch
+            processing); the workflow is skipped and the result is saved
     
     Returns:
         str: Processing result message
@@ -216,10 +268,12 @@ def process_news_article(news_data):
         print(f"🎯 Using Evaluator-Optimizer pattern for risk analysis")
         
         # Use Evaluator-Optimizer pattern - let exceptions bubble up to Huey
-        risk_analysis = process_news_with_evaluator_optimizer(
-            news_data, 
-            max_iterations=Config.MAX_OPTIMIZATION_ITERATIONS
-        )
+        if risk_analysis is None:
+            risk_analysis = process_news_with_evaluator_optimizer(
+                news_data, 
+                max_iterations=Config.MAX_OPTIMIZATION_ITERATIONS,
+                initial_response=generation_response
+            )
         
         # ==========================================
         # STEP 1.5: Theme Classification
@@ -474,6 +528,13 @@ def process_news_article(news_data):
             print(f"⚠️ Warning: Failed to update daily risk calculation: {e}")
             # Don't raise - continue with processing
         
+        # Refresh materialized dashboard tables so API reads see the new article
+        # (at most once per MATERIALIZED_REFRESH_INTERVAL; the periodic task covers the rest)
+        try:
+            refresh_materialized_debounced()
+        except Exception as e:
+            print(f"⚠️ Warning: Failed to refresh materialized dashboard tables: {e}")
+        
         # ==========================================
         # STEP 6: Trigger SSE event for real-time frontend updates
         # ==========================================
@@ -654,6 +715,7 @@ def calculate_daily_risk_score():
                 WHERE DATE(published_date) = ?
                   AND severity_level IN ('Critical', 'High')
                   AND keywords IS NOT NULL
+                  AND keywords_json_valid = 1
                   AND value IS NOT NULL
                 GROUP BY value
                 ORDER BY frequency DESC
@@ -734,6 +796,9 @@ def auto_process_news():
             if unprocessed_count > 0:
                 print(f"📰 Found {unprocessed_count} unprocessed articles - queuing for processing...")
                 
+                # Articles already waiting on a Batch API job are not queued again
+                pending_ids = get_pending_batch_news_ids() if Config.USE_BATCH_API else []
+                
                 # Get unprocessed news
                 knowledge_conn.row_factory = sqlite3.Row
                 unprocessed_news = knowledge_conn.execute("""
@@ -741,28 +806,41 @@ def auto_process_news():
                            language, date_line, badges, teaser
                     FROM raw_news_data 
                     WHERE processed = 0
+                      AND news_id NOT IN (SELECT value FROM json_each(?))
                     ORDER BY creation_timestamp DESC
-                    LIMIT 10
-                """).fetchall()
+                    LIMIT ?
+                """, [json.dumps(pending_ids), Config.BATCH_API_MAX_ITEMS if Config.USE_BATCH_API else 10]).fetchall()
                 
                 # Queue each article for processing
+                batch_items = []
+                grouped_items = []
+                concurrent_items = []
                 for news_row in unprocessed_news:
-                    news_data = {
-                        'newsId': news_row['news_id'],
-                        'headline': news_row['headline'],
-                        'story': news_row['story'],
-                        'newsSource': news_row['news_source'], 
-                        'creationTimestamp': news_row['creation_timestamp'],
-                        'language': news_row['language'],
-                        'dateLine': news_row['date_line'],
-                        'badges': news_row['badges'],
-                        'teaser': news_row['teaser'] if news_row['teaser'] else ''
-                    }
+                    news_data = news_data_from_row(news_row)
                     
-                    # Queue for processing using our new Evaluator-Optimizer workflow
-                    process_news_article(news_data)
+                    if Config.USE_BATCH_API and not is_breaking_news(news_data):
+                        batch_items.append(news_data)
+                    elif Config.GENERATION_GROUP_SIZE > 1:
+                        grouped_items.append(news_data)
+                    elif Config.CONCURRENT_PROCESSING:
+                        concurrent_items.append(news_data)
+                    else:
+                        # Queue for processing using our new Evaluator-Optimizer workflow
+                        process_news_article(news_data)
+                
+                if batch_items:
+                    # Submit inline so the next run already sees these as pending
+                    enqueue_batch_generation.call_local(batch_items)
+                
+                if concurrent_items:
+                    process_news_concurrently(concurrent_items)
                 
-                print(f"✅ Queued {len(unprocessed_news)} articles for processing")
+                group_size = Config.GENERATION_GROUP_SIZE
+                for start in range(0, len(grouped_items), group_size):
+                    process_news_group(grouped_items[start:start + group_size])
+                
+                print(f"✅ Queued {len(unprocessed_news) - len(batch_items)} articles for processing"
+                      f"{f', {len(batch_items)} via Batch API' if batch_items else ''}")
             else:
                 print("✅ No unprocessed news found - system is up to date")
                 
@@ -770,6 +848,190 @@ def auto_process_news():
         print(f"❌ Auto-processing error: {e}")
         # Don't raise - let the periodic task continue on next cycle
 
+@huey.task()
+def process_news_concurrently(news_list):
+    """
+    Run the Evaluator-Optimizer workflow for several articles at once and save the results
+    
+    The LLM calls of all articles overlap (aprocess_news_batch) instead of each
+    article waiting on its own generator/evaluator round-trips. Articles whose
+    analysis fails are queued individually so they still get Huey retries.
+    
+    Args:
+        news_list (list): news_data dicts (see process_news_article)
+    """
+    from evaluator_optimizer import aprocess_news_batch
+    
+    results = asyncio.run(aprocess_news_batch(news_list, max_iterations=Config.MAX_OPTIMIZATION_ITERATIONS))
+    
+    for news_data, result in zip(news_list, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Concurrent analysis failed for news {news_data['newsId']}, queuing individually: {result}")
+            process_news_article(news_data)
+            continue
+        
+        try:
+            process_news_article.call_local(news_data, risk_analysis=result)
+        except Exception as e:
+            # Already logged by process_news_article; don't let one article stop the rest
+            print(f"⚠️ Warning: Saving news {news_data['newsId']} failed, queuing individually: {e}")
+            process_news_article(news_data)
+
+@huey.task()
+def process_news_group(news_list):
+    """
+    Generate the first-pass analyses of several articles with one LLM call
+    
+    Each article is then queued with its share of the response and resumes the
+    Evaluator-Optimizer workflow at the evaluation step. Articles missing from
+    the response (or all of them, if the grouped call fails) are generated
+    individually as usual.
+    
+    Args:
+        news_list (list): news_data dicts (see process_news_article)
+    """
+    from evaluator_optimizer import generate_group_responses
+    
+    try:
+        responses = generate_group_responses(news_list)
+    except Exception as e:
+        print(f"⚠️ Grouped generation failed, queuing {len(news_list)} articles individually: {e}")
+        responses = {}
+    
+    for news_data in news_list:
+        process_news_article(news_data, generation_response=responses.get(news_data['newsId']))
+
+def news_data_from_row(news_row):
+    """Build the task payload for a raw_news_data row"""
+    return {
+        'newsId': news_row['news_id'],
+        'headline': news_row['headline'],
+        'story': news_row['story'],
+        'newsSource': news_row['news_source'], 
+        'creationTimestamp': news_row['creation_timestamp'],
+        'language': news_row['language'],
+        'dateLine': news_row['date_line'],
+        'badges': news_row['badges'],
+        'teaser': news_row['teaser'] if news_row['teaser'] else ''
+    }
+
+def is_breaking_news(news_data):
+    """Breaking news is analyzed immediately rather than through the Batch API"""
+    return 'breaking' in (news_data.get('badges') or '').lower()
+
+# ==========================================
+# BATCH API: Backlog generation at batch pricing
+# ==========================================
+
+def ensure_batch_jobs_table(risk_conn):
+    """Create the table that tracks submitted Batch API jobs"""
+    risk_conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_batch_jobs (
+            batch_id TEXT PRIMARY KEY,
+            news_ids TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    """)
+
+def get_pending_batch_news_ids():
+    """
+    News ids in a Batch API job that is still running, or that were queued from a
+    finished job within the last hour (their results are still being processed by Huey)
+    """
+    with get_risk_db_connection() as risk_conn:
+        ensure_batch_jobs_table(risk_conn)
+        rows = risk_conn.execute("""
+            SELECT DISTINCT j.value
+            FROM llm_batch_jobs, json_each(llm_batch_jobs.news_ids) AS j
+            WHERE status = 'submitted'
+               OR completed_at > datetime('now', '-1 hour')
+        """).fetchall()
+    return [row[0] for row in rows]
+
+@huey.task(retries=Config.MAX_RETRIES, retry_delay=Config.RETRY_DELAY)
+def enqueue_batch_generation(news_list):
+    """
+    Submit first-pass risk analysis generation for many articles as one Batch API job
+    
+    Args:
+        news_list (list): news_data dicts (see process_news_article)
+    """
+    from evaluator_optimizer import submit_generation_batch
+    
+    batch_id = submit_generation_batch(news_list)
+    
+    with get_risk_db_connection() as risk_conn:
+        ensure_batch_jobs_table(risk_conn)
+        risk_conn.execute("""
+            INSERT INTO llm_batch_jobs (batch_id, news_ids, status)
+            VALUES (?, ?, 'submitted')
+        """, [batch_id, json.dumps([news_data['newsId'] for news_data in news_list])])
+        risk_conn.commit()
+    
+    return batch_id
+
+@huey.periodic_task(crontab(minute='*/5'))  # Every 5 minutes
+def poll_generation_batches():
+    """
+    Periodic task: Collect finished Batch API jobs and resume each article's
+    Evaluator-Optimizer workflow from the evaluation step
+    
+    Expired and cancelled batches still hand over the requests they finished.
+    Articles without a usable result drop out of the pending set and are picked
+    up again by auto_process_news.
+    """
+    from evaluator_optimizer import collect_generation_batch, BATCH_RUNNING_STATUSES
+    
+    try:
+        with get_risk_db_connection() as risk_conn:
+            ensure_batch_jobs_table(risk_conn)
+            pending_batches = risk_conn.execute("""
+                SELECT batch_id FROM llm_batch_jobs WHERE status = 'submitted'
+            """).fetchall()
+        
+        for (batch_id,) in pending_batches:
+            try:
+                status, responses = collect_generation_batch(batch_id)
+            except Exception as e:
+                print(f"⚠️ Warning: Failed to check batch {batch_id}: {e}")
+                continue
+            
+            if status in BATCH_RUNNING_STATUSES:
+                continue
+            
+            news_rows = []
+            if responses:
+                with get_knowledge_db_connection() as knowledge_conn:
+                    knowledge_conn.row_factory = sqlite3.Row
+                    news_rows = knowledge_conn.execute("""
+                        SELECT news_id, headline, story, news_source, creation_timestamp, 
+                               language, date_line, badges, teaser
+                        FROM raw_news_data 
+                        WHERE processed = 0
+                          AND news_id IN (SELECT value FROM json_each(?))
+                    """, [json.dumps(list(responses))]).fetchall()
+                
+                for news_row in news_rows:
+                    process_news_article(news_data_from_row(news_row), responses[news_row['news_id']])
+                
+                print(f"📦 Batch {batch_id} {status}: queued {len(news_rows)} articles for evaluation")
+            else:
+                print(f"⚠️ Batch {batch_id} ended with status '{status}' and no usable results")
+            
+            # Only the queued articles stay pending; the rest are free to be regenerated
+            with get_risk_db_connection() as risk_conn:
+                risk_conn.execute("""
+                    UPDATE llm_batch_jobs SET status = ?, news_ids = ?, completed_at = CURRENT_TIMESTAMP
+                    WHERE batch_id = ?
+                """, [status, json.dumps([news_row['news_id'] for news_row in news_rows]), batch_id])
+                risk_conn.commit()
+    
+    except Exception as e:
+        print(f"❌ Batch polling error: {e}")
+        # Don't raise - let the periodic task continue on next cycle
+
 @huey.periodic_task(crontab(minute='0', hour='*/6'))  # Every 6 hours
 def auto_update_risk_calculation():
     """
@@ -784,6 +1046,19 @@ def auto_update_risk_calculation():
         print(f"❌ Auto risk calculation error: {e}")
         # Don't raise - let the periodic task continue on next cycle
 
+@huey.periodic_task(crontab(minute='*/15'))  # Every 15 minutes
+def auto_refresh_materialized_views():
+    """
+    Periodic task: Rebuild the materialized dashboard tables
+    Keeps date-relative aggregates (e.g. trending topics for today) current
+    even when no new articles arrive
+    """
+    try:
+        refresh_materialized(db_path=Config.RISK_DB)
+    except Exception as e:
+        print(f"❌ Materialized view refresh error: {e}")
+        # Don't raise - let the periodic task continue on next cycle
+
 # ==========================================
 # PUBLISHER: Read knowledge store and queue news
 # ==========================================
@@ -868,9 +1143,9 @@ def publish_recent_news(hours=24):
                        language, date_line, badges, teaser
                 FROM raw_news_data 
                 WHERE processed = 0 
-                  AND creation_timestamp >= datetime(?, '-{} hours')
+                  AND creation_timestamp >= datetime(?, ?)
                 ORDER BY creation_timestamp DESC
-            """.format(hours), [latest_timestamp]).fetchall()
+            """, [latest_timestamp, f'-{hours} hours']).fetchall()
             
             print(f"📊 Found {len(recent_news)} recent unprocessed news articles")
             
@@ -982,6 +1257,7 @@ def get_dashboard_health():
             latest_timestamp = latest_timestamp_result[0]
             
             # Check recent data availability (within 24 hours of latest timestamp)
+            # Exact count, but only over the last day's index entries
             recent_news_count = risk_conn.execute("""
                 SELECT COUNT(*) FROM news_articles 
                 WHERE published_date >= datetime(?, '-24 hours')
@@ -1029,51 +1305,53 @@ def dev_reset_all_tables():
         with get_risk_db_connection() as risk_conn:
             print("🗑️  Clearing risk dashboard database...")
             
-            # Clear all processed data
-            risk_conn.execute("DELETE FROM news_articles")
-            risk_conn.execute("DELETE FROM risk_calculations")
-            risk_conn.execute("DELETE FROM sse_events")
-            risk_conn.execute("DELETE FROM dashboard_cache")
-            risk_conn.execute("DELETE FROM risk_storylines")  # Clear cached storylines
+            # All deletes and the view rebuild run in one transaction (rolled back on error)
+            with risk_conn:
+                # Clear all processed data
+                cleared_news = risk_conn.execute("DELETE FROM news_articles").rowcount
+                risk_conn.execute("DELETE FROM risk_calculations")
+                risk_conn.execute("DELETE FROM sse_events")
+                risk_conn.execute("DELETE FROM dashboard_cache")
+                risk_conn.execute("DELETE FROM risk_storylines")  # Clear cached storylines
             
-            # Reset auto-increment counters
-            risk_conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('news_articles', 'risk_calculations', 'sse_events', 'risk_storylines')")
+                # Reset auto-increment counters
+                risk_conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('news_articles', 'risk_calculations', 'sse_events', 'risk_storylines')")
             
-            # Recreate dashboard_trending_topics view with proper dynamic SQL
-            print("🔄 Recreating dashboard_trending_topics view...")
-            risk_conn.execute("DROP VIEW IF EXISTS dashboard_trending_topics")
-            risk_conn.execute("""
-                CREATE VIEW dashboard_trending_topics AS
-                SELECT 
-                    LOWER(json_extract(keywords.value, '$')) as keyword,
-                    COUNT(*) as frequency,
-                    AVG(CASE WHEN impact_score IS NOT NULL THEN impact_score ELSE 75.0 END) as avg_impact_score,
-                    MAX(published_date) as latest_mention,
-                    COUNT(CASE WHEN published_date >= (
-                        SELECT datetime(MAX(published_date), '-10 days') 
-                        FROM news_articles 
-                        WHERE status != 'Archived'
-                    ) THEN 1 END) as recent_mentions,
-                    AVG(CASE 
-                        WHEN severity_level = 'Critical' THEN 4.0
-                        WHEN severity_level = 'High' THEN 3.0  
-                        WHEN severity_level = 'Medium' THEN 2.0
-                        WHEN severity_level = 'Low' THEN 1.0
-                        ELSE 2.0
-                    END) as avg_risk_level
-                FROM news_articles, json_each(keywords) as keywords
-                WHERE DATE(published_date) = DATE('now')
-                  AND status != 'Archived'
-                  AND keywords IS NOT NULL
-                  AND json_extract(keywords.value, '$') IS NOT NULL
-                GROUP BY LOWER(json_extract(keywords.value, '$'))
-                HAVING frequency >= 1
-                ORDER BY frequency DESC, recent_mentions DESC
-                LIMIT 10
-            """)
+                # Recreate dashboard_trending_topics view with proper dynamic SQL
+                print("🔄 Recreating dashboard_trending_topics view...")
+                risk_conn.execute("DROP VIEW IF EXISTS dashboard_trending_topics")
+                risk_conn.execute("""
+                    CREATE VIEW dashboard_trending_topics AS
+                    SELECT 
+                        LOWER(json_extract(keywords.value, '$')) as keyword,
+                        COUNT(*) as frequency,
+                        AVG(CASE WHEN impact_score IS NOT NULL THEN impact_score ELSE 75.0 END) as avg_impact_score,
+                        MAX(published_date) as latest_mention,
+                        COUNT(CASE WHEN published_date >= (
+                            SELECT datetime(MAX(published_date), '-10 days') 
+                            FROM news_articles 
+                            WHERE status != 'Archived'
+                        ) THEN 1 END) as recent_mentions,
+                        AVG(CASE 
+                            WHEN severity_level = 'Critical' THEN 4.0
+                            WHEN severity_level = 'High' THEN 3.0  
+                            WHEN severity_level = 'Medium' THEN 2.0
+                            WHEN severity_level = 'Low' THEN 1.0
+                            ELSE 2.0
+                        END) as avg_risk_level
+                    FROM news_articles, json_each(keywords) as keywords
+                    WHERE DATE(published_date) = DATE('now')
+                      AND status != 'Archived'
+                      AND keywords IS NOT NULL
+                      AND json_extract(keywords.value, '$') IS NOT NULL
+                    GROUP BY LOWER(json_extract(keywords.value, '$'))
+                    HAVING frequency >= 1
+                    ORDER BY frequency DESC, recent_mentions DESC
+                    LIMIT 10
+                """)
             
-            risk_conn.commit()
-            print("✅ Risk dashboard database cleared")
+            refresh_materialized(db_path=Config.RISK_DB)
+            print(f"✅ Risk dashboard database cleared ({cleared_news} processed articles removed)")
             print("✅ Dashboard trending topics view recreated with dynamic data")
         
         # Reset raw news data processed flags
@@ -1110,13 +1388,10 @@ def dev_reset_all_tables():
         except Exception as e:
             print(f"⚠️  Could not clear Huey queue: {e}")
         
-        # Get final counts
-        with get_risk_db_connection() as risk_conn:
-            processed_count = risk_conn.execute("SELECT COUNT(*) FROM news_articles").fetchone()[0]
-            
-        with get_knowledge_db_connection() as knowledge_conn:
-            total_raw = knowledge_conn.execute("SELECT COUNT(*) FROM raw_news_data").fetchone()[0]
-            unprocessed_raw = knowledge_conn.execute("SELECT COUNT(*) FROM raw_news_data WHERE processed = 0").fetchone()[0]
+        # Final counts come from the statements above: news_articles was emptied and
+        # the unconditional UPDATE touched (and unprocessed) every raw row
+        processed_count = 0
+        total_raw = unprocessed_raw = affected_rows
         
         print("\n📊 RESET COMPLETE - System Status:")
         print(f"   📰 Raw news articles: {total_raw} total, {unprocessed_raw} unprocessed")
@@ -1208,6 +1483,60 @@ def dev_add_test_news(count=1):
         print(error_msg)
         return {'status': 'error', 'error': str(e)}
 
+def dev_check_concurrent_processing(count=2):
+    """
+    DEVELOPMENT ONLY: Run two concurrent batches back to back in this process
+
+    Each batch gets its own asyncio.run(), as consecutive process_news_concurrently
+    tasks do, so a client left bound to the first event loop shows up as failures
+    in the second. The batches take different unprocessed articles (so neither is
+    served from the response cache) and nothing is saved.
+    """
+    from evaluator_optimizer import aprocess_news_batch
+
+    print(f"🧪 Checking two back-to-back concurrent batches of {count} article(s)...")
+
+    try:
+        with get_knowledge_db_connection() as knowledge_conn:
+            knowledge_conn.row_factory = sqlite3.Row
+            rows = knowledge_conn.execute("""
+                SELECT news_id, headline, story, news_source, creation_timestamp,
+                       language, date_line, badges, teaser
+                FROM raw_news_data
+                WHERE processed = 0
+                ORDER BY creation_timestamp DESC
+                LIMIT ?
+            """, [2 * count]).fetchall()
+
+        if len(rows) < 2 * count:
+            print(f"❌ Need {2 * count} unprocessed articles, found {len(rows)} (python dev_utils.py add-test N)")
+            return {'status': 'error', 'error': 'not enough unprocessed news'}
+
+        news_list = [news_data_from_row(row) for row in rows]
+        failures = []
+        for run, batch in enumerate((news_list[:count], news_list[count:]), 1):
+            results = asyncio.run(aprocess_news_batch(batch, max_iterations=Config.MAX_OPTIMIZATION_ITERATIONS))
+            errors = [str(result) for result in results if isinstance(result, Exception)]
+            print(f"   Run {run}: {len(results) - len(errors)} analyzed, {len(errors)} failed")
+            for error in errors:
+                print(f"      ⚠️ {error}")
+            failures.append(len(errors))
+
+        if any(failures):
+            print("❌ Not every article was analyzed - see the errors above")
+            return {'status': 'error', 'failures': failures}
+
+        print("✅ Both batches analyzed every article")
+        return {'status': 'success', 'failures': failures}
+
+    except Exception as e:
+        error_msg = f"❌ Concurrent processing check failed: {e}"
+        print(error_msg)
+        return {'status': 'error', 'error': str(e)}
+
+# Row template for dev_system_status (headline is already truncated in SQL)
+UNPROCESSED_ROW_FMT = "   • {}: {}... ({})".format
+
 def dev_system_status():
     """
     DEVELOPMENT ONLY: Get comprehensive system status for debugging
@@ -1246,7 +1575,7 @@ def dev_system_status():
             
             if raw_stats[0] > 0:
                 recent_unprocessed = knowledge_conn.execute("""
-                    SELECT news_id, headline, creation_timestamp
+                    SELECT news_id, substr(headline, 1, 60) as headline, creation_timestamp
                     FROM raw_news_data 
                     WHERE processed = 0 
                     ORDER BY creation_timestamp DESC 
@@ -1269,6 +1598,9 @@ def dev_system_status():
             
             risk_calc_count = risk_conn.execute("SELECT COUNT(*) FROM risk_calculations").fetchone()[0]
         
+        # Dashboard views and their materialized copies (existence + counts in two queries)
+        view_counts = count_rows(DASHBOARD_VIEWS + list(MATERIALIZED_VIEWS), db_path=Config.RISK_DB)
+        
         # Display status
         print(f"📰 RAW NEWS DATA:")
         print(f"   Total: {raw_stats[0]} articles")
@@ -1284,10 +1616,16 @@ def dev_system_status():
         print(f"\n💰 MARKET DATA:")
         print(f"   Risk calculations: {risk_calc_count}")
         
+        print(f"\n🗂️  DASHBOARD VIEWS:")
+        for name, count in view_counts.items():
+            if count is None:
+                print(f"   ❌ {name}: missing")
+            else:
+                print(f"   ✅ {name}: {count} rows")
+        
         if recent_unprocessed:
             print(f"\n📋 RECENT UNPROCESSED NEWS:")
-            for news in recent_unprocessed:
-                print(f"   • {news[0]}: {news[1][:60]}... ({news[2]})")
+            print("\n".join(UNPROCESSED_ROW_FMT(*news) for news in recent_unprocessed))
         else:
             print(f"\n✅ NO UNPROCESSED NEWS - System is up to date!")
         
@@ -1317,7 +1655,8 @@ def dev_system_status():
             },
             'market_data': {
                 'risk_calculations': risk_calc_count
-            }
+            },
+            'dashboard_views': view_counts
         }
         
         print("\n" + "=" * 50)
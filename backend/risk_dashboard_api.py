@@ -28,7 +28,7 @@ import json
 import os
 import asyncio
 import traceback
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
 from contextlib import contextmanager
 import sqlite3
@@ -37,6 +37,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 from sse_starlette.sse import EventSourceResponse
 from dotenv import load_dotenv
+from db import get_conn, approximate_row_counts, fts_phrase
 from sse_event_system import (
     SSEEventManager, 
     emit_connection_event, 
@@ -129,33 +130,18 @@ app.add_middleware(
 
 @contextmanager
 def get_risk_db_connection():
-    """Get connection to risk dashboard database"""
-    conn = sqlite3.connect(RISK_DB, timeout=30)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """Get shared connection to risk dashboard database"""
+    yield get_conn(RISK_DB)
 
 @contextmanager
 def get_knowledge_db_connection():
-    """Get connection to knowledge database"""
-    conn = sqlite3.connect(KNOWLEDGE_DB, timeout=30)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """Get shared connection to knowledge database"""
+    yield get_conn(KNOWLEDGE_DB)
 
 @contextmanager  
 def get_db_connection():
-    """Get connection to the main database (defaults to risk dashboard database)"""
-    conn = sqlite3.connect(RISK_DB, timeout=30)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """Get shared connection to the main database (defaults to risk dashboard database)"""
+    yield get_conn(RISK_DB)
 
 # ==========================================
 # UTILITY FUNCTIONS
@@ -301,6 +287,27 @@ def get_time_window_description(time_window: str = "today", from_date: str = Non
     }
     return descriptions.get(time_window, "today")
 
+def minutes_since(timestamp: Optional[str], now: datetime) -> int:
+    """
+    Whole minutes from a stored timestamp to now.
+    
+    Args:
+        timestamp: Stored date/time (naive values are UTC, as for SQLite's 'now')
+        now: Naive UTC reference time, taken once per response
+        
+    Returns:
+        Rounded minutes, or 0 if the timestamp is missing or unparseable
+    """
+    if not timestamp:
+        return 0
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return 0
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return round((now - moment).total_seconds() / 60)
+
 # ==========================================
 # NEWS ENDPOINTS
 # ==========================================
@@ -313,6 +320,7 @@ async def get_latest_news(
     risk_category: Optional[str] = Query(None),
     is_trending: Optional[bool] = Query(None),
     is_breaking: Optional[bool] = Query(None),
+    search: Optional[str] = Query(None, min_length=2, max_length=200, description="Full-text search over headline and content"),
     time_window: str = Query("today", description="Time window for news filtering (1h, 4h, 8h, 12h, today, yesterday, 3d, 7d, 14d, 1m, 3m, 6m)")
 ):
     """Get latest news articles with optional filtering"""
@@ -338,6 +346,11 @@ async def get_latest_news(
                 where_conditions.append("is_breaking_news = ?")
                 params.append(1 if is_breaking else 0)
             
+            if search:
+                # FTS5 inverted index instead of a leading-wildcard LIKE scan
+                where_conditions.append("id IN (SELECT rowid FROM news_articles_fts WHERE news_articles_fts MATCH ?)")
+                params.append(fts_phrase(search))
+            
             # Time window condition
             time_window_clause = time_window_to_datetime_clause(time_window)
             where_conditions.append(time_window_clause)
@@ -400,8 +413,7 @@ async def get_recent_news_feed(
                     is_market_moving, requires_action, keywords, entities,
                     primary_theme, theme_display_name, theme_confidence, theme_keywords,
                     impact_score, temporal_impact, urgency_level, is_regulatory,
-                    historical_impact_analysis,
-                    ROUND((JULIANDAY('now') - JULIANDAY(published_date)) * 24 * 60) as minutes_ago
+                    historical_impact_analysis
                 FROM news_articles 
                 WHERE status != 'Archived'
                   AND {time_clause}
@@ -420,6 +432,9 @@ async def get_recent_news_feed(
                 except json.JSONDecodeError:
                     return default if default is not None else []
             
+            # Relative times against one reference instant (UTC, like SQLite's 'now')
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            
             articles = []
             for row in rows:
                 articles.append({
@@ -453,7 +468,7 @@ async def get_recent_news_feed(
                     "theme_confidence": row["theme_confidence"],
                     "theme_keywords": safe_json_loads(row["theme_keywords"], []),
                     "historical_impact_analysis": row["historical_impact_analysis"],
-                    "minutes_ago": int(row["minutes_ago"]) if row["minutes_ago"] else 0
+                    "minutes_ago": minutes_since(row["published_date"], now)
                 })
             
             return {
@@ -545,17 +560,27 @@ async def get_dashboard_summary(
             """
             counts_data = conn.execute(counts_query).fetchone()
             
-            # Sentiment analysis for the time window
+            # Sentiment analysis for the time window - one bucketed scan
+            # (NULL scores land in a NULL bucket and only count toward the total)
             sentiment_query = f"""
                 SELECT 
-                    COUNT(CASE WHEN sentiment_score > 0.1 THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as positive_pct,
-                    COUNT(CASE WHEN sentiment_score BETWEEN -0.1 AND 0.1 THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as neutral_pct,
-                    COUNT(CASE WHEN sentiment_score < -0.1 THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as negative_pct
+                    CASE WHEN sentiment_score > 0.1 THEN 1
+                         WHEN sentiment_score >= -0.1 THEN 0
+                         WHEN sentiment_score < -0.1 THEN -1
+                    END as bucket,
+                    COUNT(*) as count
                 FROM news_articles 
                 WHERE status != 'Archived'
                   AND {time_clause}
+                GROUP BY bucket
             """
-            sentiment_data = conn.execute(sentiment_query).fetchone()
+            sentiment_buckets = {row["bucket"]: row["count"] for row in conn.execute(sentiment_query)}
+            sentiment_total = sum(sentiment_buckets.values())
+            
+            def sentiment_pct(bucket):
+                if not sentiment_total:
+                    return 0.0
+                return round(sentiment_buckets.get(bucket, 0) * 100.0 / sentiment_total, 1)
             
             # Trending topics for the time window
             trending_query = f"""
@@ -580,7 +605,7 @@ async def get_dashboard_summary(
                 WHERE status != 'Archived'
                   AND {time_clause}
                   AND keywords IS NOT NULL
-                  AND json_valid(keywords) = 1
+                  AND keywords_json_valid = 1
                   AND keywords.value IS NOT NULL
                   AND LENGTH(TRIM(keywords.value)) > 2
                 GROUP BY LOWER(keywords.value)
@@ -660,9 +685,9 @@ async def get_dashboard_summary(
                     "current_risk_score": counts_data["current_risk_score"] or 0.0
                 },
                 "sentiment_analysis": {
-                    "positive_pct": round(sentiment_data["positive_pct"] or 0.0, 1),
-                    "neutral_pct": round(sentiment_data["neutral_pct"] or 0.0, 1),
-                    "negative_pct": round(sentiment_data["negative_pct"] or 0.0, 1)
+                    "positive_pct": sentiment_pct(1),
+                    "neutral_pct": sentiment_pct(0),
+                    "negative_pct": sentiment_pct(-1)
                 },
                 "trending_topics": [
                     {
@@ -716,10 +741,10 @@ async def get_risk_calculations(
         with get_risk_db_connection() as conn:
             rows = conn.execute("""
                 SELECT * FROM risk_calculations 
-                WHERE calculation_date >= DATE('now', '-{} days')
+                WHERE calculation_date >= DATE('now', ?)
                 ORDER BY calculation_date DESC
                 LIMIT ?
-            """.format(days), [limit]).fetchall()
+            """, [f'-{days} days', limit]).fetchall()
             
             calculations = [format_risk_calculation(row) for row in rows]
             
@@ -739,14 +764,16 @@ async def get_risk_calculations(
 async def get_trend_analytics(days: int = Query(7, ge=1, le=30)):
     """Get trend analytics data"""
     try:
+        # Bound as a parameter so the cached statement is reused for any window
+        days_modifier = f'-{days} days'
         with get_risk_db_connection() as conn:
             # Risk score trend
             risk_trend = conn.execute("""
                 SELECT calculation_date, overall_risk_score, risk_trend
                 FROM risk_calculations 
-                WHERE calculation_date >= DATE('now', '-{} days')
+                WHERE calculation_date >= DATE('now', ?)
                 ORDER BY calculation_date ASC
-            """.format(days)).fetchall()
+            """, [days_modifier]).fetchall()
             
             # News volume by date
             news_volume = conn.execute("""
@@ -757,22 +784,22 @@ async def get_trend_analytics(days: int = Query(7, ge=1, le=30)):
                        SUM(CASE WHEN severity_level = 'Medium' THEN 1 ELSE 0 END) as medium,
                        SUM(CASE WHEN severity_level = 'Low' THEN 1 ELSE 0 END) as low
                 FROM news_articles 
-                WHERE DATE(published_date) >= DATE('now', '-{} days')
+                WHERE DATE(published_date) >= DATE('now', ?)
                   AND status != 'Archived'
                 GROUP BY DATE(published_date)
                 ORDER BY date ASC
-            """.format(days)).fetchall()
+            """, [days_modifier]).fetchall()
             
             # Risk category distribution
             category_distribution = conn.execute("""
                 SELECT primary_risk_category, COUNT(*) as count,
                        AVG(overall_risk_score) as avg_score
                 FROM news_articles 
-                WHERE DATE(published_date) >= DATE('now', '-{} days')
+                WHERE DATE(published_date) >= DATE('now', ?)
                   AND status != 'Archived'
                 GROUP BY primary_risk_category
                 ORDER BY count DESC
-            """.format(days)).fetchall()
+            """, [days_modifier]).fetchall()
             
             return {
                 "risk_trend": [
@@ -815,7 +842,7 @@ async def get_risk_breakdown():
     """Get risk category breakdown using optimized view"""
     try:
         with get_risk_db_connection() as conn:
-            rows = conn.execute("SELECT * FROM dashboard_risk_breakdown").fetchall()
+            rows = conn.execute("SELECT * FROM mv_dashboard_risk_breakdown").fetchall()
             
             breakdown = []
             for row in rows:
@@ -839,7 +866,7 @@ async def get_dashboard_only_summary():
     """Get basic dashboard summary using optimized view"""
     try:
         with get_risk_db_connection() as conn:
-            row = conn.execute("SELECT * FROM dashboard_summary").fetchone()
+            row = conn.execute("SELECT * FROM mv_dashboard_summary").fetchone()
             
             if not row:
                 return {
@@ -1007,10 +1034,12 @@ async def generate_theme_storyline(
         )
         
         # First, get ALL articles for this theme (not limited)
+        # The prompt only quotes the first 300 characters of content, so truncate in SQL
+        # rather than pulling full article bodies into Python
         with get_db_connection() as conn:
             cursor = conn.execute("""
                 SELECT 
-                    id, headline, content, summary, description, source_name,
+                    id, headline, substr(content, 1, 300) AS content, summary, description, source_name,
                     countries, affected_markets, financial_exposure, 
                     severity_level, overall_risk_score, confidence_score,
                     published_date, processed_date, theme_display_name,
@@ -1019,9 +1048,9 @@ async def generate_theme_storyline(
                 FROM news_articles 
                 WHERE primary_theme = ?
                     AND sentiment_score < 0  -- Only negative news
-                    AND processed_date >= datetime((SELECT MAX(published_date) FROM news_articles), '-{} days')
+                    AND processed_date >= datetime((SELECT MAX(published_date) FROM news_articles), ?)
                 ORDER BY overall_risk_score DESC, published_date DESC
-            """.format(days_back), [theme_id])
+            """, [theme_id, f'-{days_back} days'])
             
             all_articles = cursor.fetchall()
             
@@ -1617,13 +1646,17 @@ async def health_check():
             # Test knowledge database connection
             knowledge_conn.execute("SELECT 1").fetchone()
         
+        # Planner estimates (sqlite_stat1) - O(1), no table scan for a health probe
+        row_estimates = approximate_row_counts(['news_articles', 'sse_events'], RISK_DB)
+        
         return {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
             "databases": {
                 "risk_db": "connected",
                 "knowledge_db": "connected"
-            }
+            },
+            "approximate_row_counts": row_estimates
         }
         
     except Exception as e:
@@ -1700,7 +1733,7 @@ async def download_storyline_report(theme_id: str):
             # Get related articles for the report
             cursor = conn.execute("""
                 SELECT 
-                    id, headline, content, summary, source_name,
+                    id, headline, summary, source_name,
                     countries, affected_markets, financial_exposure, 
                     severity_level, overall_risk_score, published_date
                 FROM news_articles 
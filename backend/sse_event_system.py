@@ -6,8 +6,8 @@ Maps rich backend events to database-constrained event types
 import json
 from datetime import datetime
 from contextlib import contextmanager
-import sqlite3
 from typing import Dict, Any, Optional, List
+from db import get_conn, transaction, RISK_DB
 
 # Database-allowed event types (envelope categories)
 DB_EVENT_TYPES = {
@@ -55,13 +55,8 @@ EVENT_PRIORITIES = {
 
 @contextmanager
 def get_risk_db_connection():
-    """Get database connection for SSE events"""
-    conn = sqlite3.connect('risk_dashboard.db')
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """Get shared database connection for SSE events"""
+    yield get_conn(RISK_DB)
 
 class SSEEventManager:
     """
@@ -205,28 +200,41 @@ class SSEEventManager:
             return False
     
     @staticmethod
-    def cleanup_old_events(days_old: int = 7) -> int:
+    def cleanup_old_events(days_old: int = 7, batch_size: int = 5000) -> int:
         """
         Clean up old processed events
         
+        Deletes in bounded batches, each in its own explicit transaction, so a
+        large backlog doesn't hold the write lock or grow the WAL in one go.
+        
         Args:
             days_old: Remove events older than this many days
+            batch_size: Maximum rows deleted per transaction
             
         Returns:
             int: Number of events removed
         """
         try:
-            with get_risk_db_connection() as conn:
-                result = conn.execute("""
-                    DELETE FROM sse_events 
-                    WHERE processed = 1 
-                    AND created_at < datetime('now', '-{} days')
-                """.format(days_old))
-                conn.commit()
+            removed_count = 0
+            while True:
+                # Writer connection of this thread, not the shared autocommit one
+                with transaction(RISK_DB) as conn:
+                    result = conn.execute("""
+                        DELETE FROM sse_events 
+                        WHERE rowid IN (
+                            SELECT rowid FROM sse_events
+                            WHERE processed = 1 
+                            AND created_at < datetime('now', ?)
+                            LIMIT ?
+                        )
+                    """, [f'-{days_old} days', batch_size])
                 
-                removed_count = result.rowcount
-                print(f"🧹 Cleaned up {removed_count} old SSE events")
-                return removed_count
+                removed_count += result.rowcount
+                if result.rowcount < batch_size:
+                    break
+            
+            print(f"🧹 Cleaned up {removed_count} old SSE events")
+            return removed_count
                 
         except Exception as e:
             print(f"❌ Failed to cleanup old events: {e}")
@@ -4,15 +4,40 @@ but supporting both OpenAI and Azure OpenAI as backends.
 """
 
 import openai
+import httpx
 import os
 import re
+import sys
 import json
+import time
+import queue
+import atexit
+import random
+import asyncio
+import weakref
+import threading
 import logging
-from typing import Dict, Any, Optional
+import logging.handlers
+import importlib.util
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 from dotenv import load_dotenv
 from datetime import datetime
+from llm_cache import LLMCache, create_llm_cache
+
+# orjson parses model output several times faster; fall back to stdlib json
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# tiktoken gives exact token counts for truncation; without it text is cut at ~4 characters per token
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 # Load environment variables
 load_dotenv(override=True)  # Force reload environment variables
@@ -23,17 +48,40 @@ os.makedirs(log_dir, exist_ok=True)
 
 log_file = os.path.join(log_dir, 'llm_calls.log')
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
+# Callers only enqueue records; a background listener thread applies the log format and does the
+# file/console I/O, so concurrent workers don't contend on the stream locks
+_log_queue = queue.SimpleQueue()
+_log_handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# The queue handler only renders the message; the listener's handlers apply the full format
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
 logger = logging.getLogger(__name__)
 
 
+def _log_directly_after_fork():
+    """
+    Forked children (e.g. Huey process workers) don't inherit the listener thread, so
+    records queued there would never be written: attach the real handlers instead.
+    """
+    root = logging.getLogger()
+    if _queue_handler in root.handlers:
+        root.removeHandler(_queue_handler)
+        for handler in _log_handlers:
+            root.addHandler(handler)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_log_directly_after_fork)
+
+
 def safe_json_loads(field_value, default=None):
     """Safely parse JSON with error handling"""
     if not field_value:
@@ -41,11 +89,42 @@ def safe_json_loads(field_value, default=None):
     try:
         return json.loads(field_value)
     except json.JSONDecodeError as e:
-        print(f"JSON parse error: {e}")
-        print(f"Problematic value: {repr(field_value)}")
+        logger.warning("JSON parse error: %s; problematic value: %r", e, field_value)
         return default if default is not None else []
 
 
+def _http_client_options() -> dict:
+    """
+    Connection pool and timeouts for the HTTP clients behind the OpenAI clients.
+    
+    The sync client is created once per process and each event loop gets one async
+    client, so keep-alive connections (and their TLS sessions) are reused across
+    calls instead of paying a handshake per request.
+    """
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', '50')),
+            max_keepalive_connections=int(os.getenv('LLM_HTTP_MAX_KEEPALIVE', '20'))
+        ),
+        "timeout": httpx.Timeout(float(os.getenv('LLM_HTTP_TIMEOUT', '60')), connect=5.0),
+        "http2": _http2_enabled(),
+    }
+
+
+def _http2_enabled() -> bool:
+    """
+    LLM_HTTP2: multiplex concurrent requests over one connection per host.
+    
+    httpx needs the optional h2 package for HTTP/2; without it the clients stay on HTTP/1.1.
+    """
+    if os.getenv('LLM_HTTP2', 'false').lower() != 'true':
+        return False
+    if importlib.util.find_spec('h2') is None:
+        print("⚠️ Warning: LLM_HTTP2 requires the h2 package (pip install 'httpx[http2]'), using HTTP/1.1")
+        return False
+    return True
+
+
 # Initialize LLM client based on provider configuration
 def _initialize_llm_client():
     """Initialize the appropriate OpenAI client based on configuration"""
@@ -66,7 +145,8 @@ def _initialize_llm_client():
         return openai.AzureOpenAI(
             api_key=api_key,
             azure_endpoint=endpoint,
-            api_version=api_version
+            api_version=api_version,
+            http_client=httpx.Client(**_http_client_options())
         )
     else:
         # Standard OpenAI configuration
@@ -75,11 +155,51 @@ def _initialize_llm_client():
             raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY environment variable")
         
         print(f"🔧 Initializing OpenAI client")
-        return openai.OpenAI(api_key=api_key)
+        return openai.OpenAI(api_key=api_key, http_client=httpx.Client(**_http_client_options()))
+
+def _initialize_async_llm_client():
+    """Initialize the async counterpart of the configured client (used for batch processing)"""
+    provider = os.getenv('LLM_PROVIDER', 'openai').lower()
+    
+    if provider == 'azure':
+        return openai.AsyncAzureOpenAI(
+            api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
+            api_version=os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview'),
+            http_client=httpx.AsyncClient(**_http_client_options())
+        )
+    return openai.AsyncOpenAI(
+        api_key=os.getenv('OPENAI_API_KEY'),
+        http_client=httpx.AsyncClient(**_http_client_options())
+    )
 
 # Initialize the client
 client = _initialize_llm_client()
 
+# Async clients by event loop: httpx's pooled connections belong to the loop that opened
+# them, and each Huey task runs its batch under its own asyncio.run()
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+def get_async_client():
+    """Async client for the running event loop, created on first use"""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        async_client = _async_clients.get(loop)
+        if async_client is None:
+            async_client = _async_clients[loop] = _initialize_async_llm_client()
+    return async_client
+
+async def aclose_async_client():
+    """Close the running event loop's async client; call before the loop shuts down"""
+    with _async_clients_lock:
+        async_client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if async_client is not None:
+        await async_client.close()
+
+# Response cache shared by llm_call / llm_call_async (None when LLM_CACHE_BACKEND=none)
+llm_cache = create_llm_cache()
+
 def get_model_name() -> str:
     """Get the model name based on provider configuration"""
     provider = os.getenv('LLM_PROVIDER', 'openai').lower()
@@ -94,14 +214,22 @@ def get_model_name() -> str:
         return model_name
 
 
-def llm_call(messages: list, model: str = None, temperature: float = 0.1) -> str:
+def llm_call(messages: list, model: str = None, temperature: float = 0.1, use_cache: bool = True,
+             response_format: dict = None, max_tokens: int = None, stop_pattern: str = None) -> str:
     """
     Make a call to OpenAI's API (or Azure OpenAI) with consistent error handling.
     
+    Throttled by the shared rate limiter; a 429 pauses the limiter so the other
+    workers in this process back off, then the error goes to Huey for retry.
+    
     Args:
         messages: List of message dictionaries with 'role' and 'content'
         model: Model/deployment name to use (if None, uses configured default)
         temperature: Sampling temperature
+        use_cache: Serve identical requests from the response cache
+        response_format: Optional response_format (e.g. a json_schema for structured outputs)
+        max_tokens: Optional cap on completion tokens
+        stop_pattern: Optional regex; the response is streamed and cut off as soon as it matches
         
     Returns:
         str: The response content from the LLM
@@ -114,26 +242,46 @@ def llm_call(messages: list, model: str = None, temperature: float = 0.1) -> str
         if model is None:
             model = get_model_name()
         
-        provider = os.getenv('LLM_PROVIDER', 'openai').lower()
-        
-        
+        cache_key = None
+        if use_cache and llm_cache is not None:
+            cache_key = LLMCache.make_key(model, messages, temperature,
+                                          response_format=response_format, max_tokens=max_tokens,
+                                          stop_pattern=stop_pattern)
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info("♻️ LLM response served from cache")
+                return cached
+        
+        get_rate_limiter().acquire_sync(estimate_tokens(messages))
         response = client.chat.completions.create(
             model=model,
             messages=messages,
-            temperature=temperature
+            temperature=temperature,
+            **({"response_format": response_format} if response_format else {}),
+            **({"max_tokens": max_tokens} if max_tokens else {}),
+            **({"stream": True} if stop_pattern else {})
         )
         
-        response_content = response.choices[0].message.content
+        if stop_pattern:
+            response_content = _read_stream(response, re.compile(stop_pattern))
+        else:
+            response_content = response.choices[0].message.content
         
+        if cache_key is not None and response_content:
+            llm_cache.set(cache_key, response_content)
         
         # Log full response for debugging (can be disabled in production)
         debug_mode = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
         if debug_mode:
-            logger.info(f"FULL LLM RESPONSE:\n{response_content}")
+            logger.info("FULL LLM RESPONSE:\n%s", response_content)
 
         return response_content
         
     except Exception as e:
+        if isinstance(e, openai.RateLimitError):
+            # Hold back the other workers in this process until the limit resets
+            _pause_after_rate_limit(e)
+        
         provider = os.getenv('LLM_PROVIDER', 'openai').lower()
         provider_name = "Azure OpenAI" if provider == 'azure' else "OpenAI"
         error_msg = f"{provider_name} API call failed: {str(e)}"
@@ -145,6 +293,287 @@ def llm_call(messages: list, model: str = None, temperature: float = 0.1) -> str
         raise Exception(error_msg)
 
 
+def _read_stream(stream, stop_re) -> str:
+    """
+    Accumulate a streamed completion, closing the connection early once stop_re matches.
+    
+    Generation stops server-side when the stream is closed, so tokens after
+    the match are neither waited for nor billed.
+    """
+    content = ""
+    for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        content += chunk.choices[0].delta.content
+        if stop_re.search(content):
+            stream.close()
+            break
+    return content
+
+
+async def _aread_stream(stream, stop_re) -> str:
+    """Async _read_stream"""
+    content = ""
+    async for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        content += chunk.choices[0].delta.content
+        if stop_re.search(content):
+            await stream.close()
+            break
+    return content
+
+
+class RateLimiter:
+    """
+    Token-bucket throttle shared by every LLM call in the process, sync and async.
+    
+    Tracks two buckets that refill continuously: requests per minute and
+    (estimated) tokens per minute. A 429 from the provider pauses both until
+    its retry time, so concurrent callers back off together instead of each
+    running into the limit separately.
+    """
+    
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        self.max_requests = max_requests_per_minute
+        self.max_tokens = max_tokens_per_minute
+        self.available_requests = float(max_requests_per_minute)
+        self.available_tokens = float(max_tokens_per_minute)
+        self.last_update = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.last_update
+        self.last_update = now
+        self.available_requests = min(self.max_requests, self.available_requests + elapsed * self.max_requests / 60.0)
+        self.available_tokens = min(self.max_tokens, self.available_tokens + elapsed * self.max_tokens / 60.0)
+    
+    def _reserve(self, tokens: int) -> float:
+        """Consume one request and `tokens` tokens if available, else return the seconds to wait"""
+        # A single oversized request would otherwise never fit in the bucket
+        tokens = min(tokens, self.max_tokens)
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self._refill(now)
+            if self.available_requests >= 1 and self.available_tokens >= tokens:
+                self.available_requests -= 1
+                self.available_tokens -= tokens
+                return 0.0
+            # Time until the emptier bucket has refilled enough
+            return max(
+                (1 - self.available_requests) * 60.0 / self.max_requests,
+                (tokens - self.available_tokens) * 60.0 / self.max_tokens,
+                0.01
+            )
+    
+    def acquire_sync(self, tokens: int):
+        """Block until one request and `tokens` tokens are available, then consume them"""
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(wait)
+    
+    async def acquire(self, tokens: int):
+        """Async acquire_sync"""
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+    
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds` (after a 429)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# x-ratelimit-reset-* durations, e.g. "1s", "6m0s", "250ms"
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, from a rate-limit error's response headers.
+    
+    Uses retry-after-ms / retry-after when present, otherwise the later of the
+    x-ratelimit-reset-requests / -tokens durations; None if there is no usable header.
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    
+    for name, scale in (('retry-after-ms', 0.001), ('retry-after', 1)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            pass
+    
+    resets = [
+        sum(float(value) * _DURATION_UNITS[unit] for value, unit in _DURATION_PART_RE.findall(headers[name]))
+        for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens') if headers.get(name)
+    ]
+    return max(resets) if resets else None
+
+
+def estimate_tokens(messages: list) -> int:
+    """Rough prompt size estimate (~4 characters per token) for rate limiting"""
+    return sum(len(message.get('content') or '') for message in messages) // 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """tiktoken encoding for a model (deployment names and new models fall back to o200k_base)"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def truncate_tokens(text: str, *max_tokens: int, model: str = None) -> Tuple[str, ...]:
+    """
+    Prefixes of text that fit the given token budgets, tokenizing the text only once.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: One or more token budgets
+        model: Model whose tokenizer to use (if None, uses configured default)
+        
+    Returns:
+        Tuple with one truncated string per budget
+    """
+    if tiktoken is None:
+        return tuple(text[:limit * 4] for limit in max_tokens)
+    
+    encoding = _get_encoding(model or get_model_name())
+    tokens = encoding.encode(text)
+    return tuple(text if len(tokens) <= limit else encoding.decode(tokens[:limit]) for limit in max_tokens)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Rate limiter shared by all LLM calls in this process"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    max_requests_per_minute=int(os.getenv('LLM_MAX_REQUESTS_PER_MINUTE', '500')),
+                    max_tokens_per_minute=int(os.getenv('LLM_MAX_TOKENS_PER_MINUTE', '150000'))
+                )
+    return _rate_limiter
+
+
+def _pause_after_rate_limit(error: Exception, attempt: int = 1) -> float:
+    """Pause the shared limiter after a 429 and return the delay (provider hint, else exponential backoff)"""
+    delay = min(60.0, _retry_after(error) or 2 ** attempt) + random.random()
+    get_rate_limiter().pause(delay)
+    return delay
+
+
+async def llm_call_async(messages: list, model: str = None, temperature: float = 0.1,
+                         max_attempts: int = 5, use_cache: bool = True,
+                         response_format: dict = None, max_tokens: int = None,
+                         stop_pattern: str = None) -> str:
+    """
+    Async version of llm_call for concurrent batch processing.
+    
+    Throttled by the shared rate limiter; 429 rate-limit responses pause it for
+    the provider's retry time (or exponential backoff with jitter) and are retried
+    before giving up.
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        model: Model/deployment name to use (if None, uses configured default)
+        temperature: Sampling temperature
+        max_attempts: Attempts before a rate-limit error is raised
+        use_cache: Serve identical requests from the response cache
+        response_format: Optional response_format (e.g. a json_schema for structured outputs)
+        max_tokens: Optional cap on completion tokens
+        stop_pattern: Optional regex; the response is streamed and cut off as soon as it matches
+        
+    Returns:
+        str: The response content from the LLM
+        
+    Raises:
+        Exception: If the API call fails (to be handled by Huey retries)
+    """
+    if model is None:
+        model = get_model_name()
+    
+    cache_key = None
+    if use_cache and llm_cache is not None:
+        cache_key = LLMCache.make_key(model, messages, temperature,
+                                      response_format=response_format, max_tokens=max_tokens,
+                                      stop_pattern=stop_pattern)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info("♻️ LLM response served from cache")
+            return cached
+    
+    limiter = get_rate_limiter()
+    prompt_tokens = estimate_tokens(messages)
+    
+    for attempt in range(1, max_attempts + 1):
+        await limiter.acquire(prompt_tokens)
+        try:
+            response = await get_async_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                **({"response_format": response_format} if response_format else {}),
+                **({"max_tokens": max_tokens} if max_tokens else {}),
+                **({"stream": True} if stop_pattern else {})
+            )
+            if stop_pattern:
+                response_content = await _aread_stream(response, re.compile(stop_pattern))
+            else:
+                response_content = response.choices[0].message.content
+            
+            if cache_key is not None and response_content:
+                llm_cache.set(cache_key, response_content)
+            
+            if os.getenv('DEBUG_MODE', 'false').lower() == 'true':
+                logger.info("FULL LLM RESPONSE:\n%s", response_content)
+            
+            return response_content
+        
+        except openai.RateLimitError as e:
+            if attempt == max_attempts:
+                logger.error(f"❌ LLM REQUEST FAILED: rate limited after {attempt} attempts: {e}")
+                raise Exception(f"LLM API call failed after {attempt} rate-limited attempts: {str(e)}")
+            # The next acquire() waits out the pause, together with every other caller
+            delay = _pause_after_rate_limit(e, attempt)
+            logger.warning(f"⏳ Rate limited (attempt {attempt}/{max_attempts}), retrying in {delay:.1f}s")
+        
+        except Exception as e:
+            provider = os.getenv('LLM_PROVIDER', 'openai').lower()
+            provider_name = "Azure OpenAI" if provider == 'azure' else "OpenAI"
+            error_msg = f"{provider_name} API call failed: {str(e)}"
+            logger.error(f"❌ LLM REQUEST FAILED: {error_msg}")
+            raise Exception(error_msg)
+
+
+def discard_cached_response(messages: list, model: str = None, temperature: float = 0.1,
+                            response_format: dict = None, max_tokens: int = None, stop_pattern: str = None):
+    """
+    Remove a cached response for these messages.
+    
+    Call this when a response could not be parsed, otherwise every Huey retry
+    would be served the same malformed answer from the cache.
+    """
+    if llm_cache is not None:
+        llm_cache.delete(LLMCache.make_key(model or get_model_name(), messages, temperature,
+                                           response_format=response_format, max_tokens=max_tokens,
+                                           stop_pattern=stop_pattern))
+
+
+@lru_cache(maxsize=32)
+def _xml_tag_pattern(tag: str):
+    """Compiled <tag>...</tag> pattern, built once per tag"""
+    return re.compile(f"<{tag}>(.*?)</{tag}>", re.DOTALL | re.IGNORECASE)
+
+
 def extract_xml(text: str, tag: str) -> Optional[str]:
     """
     Extract content from XML tags in the response text.
@@ -161,8 +590,7 @@ def extract_xml(text: str, tag: str) -> Optional[str]:
     """
     try:
         # Try to find the XML content using regex first (more robust)
-        pattern = f"<{tag}>(.*?)</{tag}>"
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        match = _xml_tag_pattern(tag).search(text)
         
         if match:
             content = match.group(1).strip()
@@ -208,8 +636,8 @@ def parse_json_from_xml(xml_content: str) -> Dict[str, Any]:
         # Clean up the content - remove any extra whitespace or formatting
         cleaned_content = xml_content.strip()
         
-        # Try to parse as JSON
-        return json.loads(cleaned_content)
+        # Try to parse as JSON (orjson's JSONDecodeError subclasses the stdlib one)
+        return _json_loads(cleaned_content)
         
     except json.JSONDecodeError as e:
         raise Exception(f"Failed to parse JSON from XML content: {str(e)}\nContent: {xml_content[:200]}...")
@@ -263,13 +691,18 @@ def validate_risk_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
         # Validate urgency level
         valid_urgency_levels = ['Critical', 'High', 'Medium', 'Low']
         if 'urgency_level' in analysis and analysis['urgency_level'] not in valid_urgency_levels:
-            print(f"⚠️ Warning: Invalid urgency level '{analysis['urgency_level']}', defaulting to 'Medium'")
+            logger.warning("⚠️ Invalid urgency level '%s', defaulting to 'Medium'", analysis['urgency_level'])
             analysis['urgency_level'] = 'Medium'
         
+        # Closed-enum values repeat across every article: intern them so each is one shared object
+        analysis['severity_level'] = sys.intern(analysis['severity_level'])
+        if 'urgency_level' in analysis:
+            analysis['urgency_level'] = sys.intern(analysis['urgency_level'])
+        
         # Validate temporal impact
         valid_temporal_impacts = ['Immediate', 'Short-term', 'Medium-term', 'Long-term']
         if 'temporal_impact' in analysis and analysis['temporal_impact'] not in valid_temporal_impacts:
-            print(f"⚠️ Warning: Invalid temporal impact '{analysis['temporal_impact']}', defaulting to 'Medium-term'")
+            logger.warning("⚠️ Invalid temporal impact '%s', defaulting to 'Medium-term'", analysis['temporal_impact'])
             analysis['temporal_impact'] = 'Medium-term'
         
         # Validate primary risk category
@@ -283,7 +716,8 @@ def validate_risk_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
         if '|' in primary_category:
             categories = [cat.strip() for cat in primary_category.split('|')]
             primary_category = categories[0]
-            print(f"Multiple risk categories detected in primary field: {analysis['primary_risk_category']}. Using primary: {primary_category}")
+            logger.info("Multiple risk categories detected in primary field: %s. Using primary: %s",
+                        analysis['primary_risk_category'], primary_category)
             analysis['primary_risk_category'] = primary_category
             
             # Add the additional categories to secondary categories
@@ -299,7 +733,7 @@ def validate_risk_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
         if 'secondary_risk_categories' in analysis:
             for secondary_cat in analysis['secondary_risk_categories']:
                 if secondary_cat not in valid_categories:
-                    print(f"Warning: Invalid secondary risk category: {secondary_cat}")
+                    logger.warning("Invalid secondary risk category: %s", secondary_cat)
                     # Remove invalid categories
                     analysis['secondary_risk_categories'] = [cat for cat in analysis['secondary_risk_categories'] if cat in valid_categories]
         
@@ -350,7 +784,7 @@ def validate_risk_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
         # Backward compatibility: if risk_category exists instead of primary_risk_category
         if 'risk_category' in analysis and 'primary_risk_category' not in analysis:
             analysis['primary_risk_category'] = analysis['risk_category']
-            print("Converted legacy 'risk_category' field to 'primary_risk_category'")
+            logger.info("Converted legacy 'risk_category' field to 'primary_risk_category'")
         
         return analysis
         